@@ -7,6 +7,17 @@ import scrapy
 
 
 class AdvertsCrawlerItem(scrapy.Item):
-    # define the fields for your item here like:
-    # name = scrapy.Field()
-    pass
+    """
+    Advert scraped from the services. Spiders fill the fields with raw text
+    and AdvertsNormalizationPipeline converts them to typed values.
+    """
+
+    place = scrapy.Field()
+    county = scrapy.Field()
+    price = scrapy.Field()
+    price_per_m2 = scrapy.Field()
+    area = scrapy.Field()
+    link = scrapy.Field()
+    date_added = scrapy.Field()
+    description = scrapy.Field()
+    image_url = scrapy.Field()
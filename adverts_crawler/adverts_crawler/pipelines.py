@@ -4,10 +4,111 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 
+import re
+from datetime import date, datetime
+from typing import *
+
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
+from scrapy.exceptions import DropItem
+
+WHITESPACE_RE = re.compile(r"\s+")
+NUMBER_RE = re.compile(r"[0-9]+(?:[.,][0-9]+)?")
+DATE_FORMATS = ("%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y", "%Y-%m-%d", "%d.%m.%Y")
+
+
+def parse_number(value: Any) -> Union[float, None]:
+    """ Parses numbers like '376 000 zł' or '169,98 zł/m²' to float. """
+
+    if value is None or isinstance(value, float):
+        return value
+    if isinstance(value, int):
+        return float(value)
+    match = NUMBER_RE.search(WHITESPACE_RE.sub("", value))
+    if match is None:
+        return None
+    return float(match.group().replace(",", "."))
+
+
+def parse_date(value: Any) -> Union[date, None]:
+    """ Parses date in one of DATE_FORMATS. Returns None if date is unknown. """
+
+    if value is None or isinstance(value, date):
+        return value
+    value = WHITESPACE_RE.sub("", value)
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_text(value: Any) -> Union[str, None]:
+    """ Collapses whitespaces in the text. """
+
+    if value is None:
+        return None
+    return WHITESPACE_RE.sub(" ", value).strip() or None
+
+
+class AdvertsNormalizationPipeline:
+    """
+    Converts raw text scraped by the spiders to typed values.
+    Drops adverts without price or area and counts them per spider.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(stats=crawler.stats)
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        for field in ("place", "county", "link", "description", "image_url"):
+            adapter[field] = parse_text(adapter.get(field))
+        for field in ("price", "price_per_m2", "area"):
+            adapter[field] = parse_number(adapter.get(field))
+        adapter["date_added"] = parse_date(adapter.get("date_added"))
+
+        if not adapter["price"] or not adapter["area"]:
+            self.stats.inc_value(f"normalization/rejected/{spider.name}")
+            raise DropItem(f"Missing price or area in {adapter['link']}")
+        if not adapter["price_per_m2"]:
+            adapter["price_per_m2"] = round(adapter["price"] / adapter["area"], 2)
+        return item
 
 
 class AdvertsCrawlerPipeline:
+    """ Saves scraped adverts to the database in batches while the crawl runs. """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.items = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(batch_size=crawler.settings.getint("ADVERTS_BATCH_SIZE"))
+
     def process_item(self, item, spider):
+        self.items.append(ItemAdapter(item).asdict())
+        if len(self.items) >= self.batch_size:
+            self.flush(spider)
         return item
+
+    def close_spider(self, spider):
+        self.flush(spider)
+
+    def flush(self, spider):
+        if not self.items:
+            return
+        # imported here, so the crawler can be loaded before django is set up
+        from parcels.models import Advert
+
+        saved = Advert.save_items(self.items, batch_size=self.batch_size)
+        spider.logger.info(
+            "Saved %s of %s adverts to the database" % (saved, len(self.items))
+        )
+        self.items = []
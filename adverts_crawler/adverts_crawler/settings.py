@@ -62,6 +62,8 @@ ROBOTSTXT_OBEY = True
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
+# The pipelines save adverts with django models, so ITEM_PIPELINES and
+# ADVERTS_BATCH_SIZE are set by parcels.tasks.run_spider
 # ITEM_PIPELINES = {
 #    'adverts_crawler.pipelines.AdvertsCrawlerPipeline': 300,
 # }
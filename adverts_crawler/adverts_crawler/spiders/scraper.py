@@ -1,6 +1,8 @@
 import scrapy
 import re
 
+from ..items import AdvertsCrawlerItem
+
 
 def remove_tags(text):
     tag_re = re.compile(r"<[^>]+>")
@@ -35,44 +37,30 @@ class MorizonSpider(scrapy.Spider):
 
     @staticmethod
     def parse_advert_data(response):
-        data = {
-            "place": response.xpath('//div[@class="col-xs-9"]/h1/strong/span[2]/text()')
+        yield AdvertsCrawlerItem(
+            place=response.xpath('//div[@class="col-xs-9"]/h1/strong/span[2]/text()')
             .get()
             .split(",")[0]
             .strip(),
-            "county": "".join(
+            county="".join(
                 response.xpath('//div[@class="col-xs-9"]/h1/strong/span/text()')
                 .get()
                 .split()
             )
             .lower()
             .replace(",", ""),
-            "price": "".join(
-                response.xpath('//li[@class="paramIconPrice"]/em/text()')
-                .get()
-                .replace(",", ".")
-                .split()
-            ),
-            "price_per_m2": "".join(
-                response.xpath('//li[@class="paramIconPriceM2"]/em/text()')
-                .get()
-                .replace(",", ".")
-                .split()
-            ),
-            "area": "".join(
-                response.xpath('//li[@class="paramIconLivingArea"]/em/text()')
-                .get()
-                .replace(",", ".")
-                .split()
-            ),
-            "link": response.meta["link"],
-            "date_added": response.meta["date_added"],
-            "description": remove_tags(
+            price=response.xpath('//li[@class="paramIconPrice"]/em/text()').get(),
+            price_per_m2=response.xpath(
+                '//li[@class="paramIconPriceM2"]/em/text()'
+            ).get(),
+            area=response.xpath('//li[@class="paramIconLivingArea"]/em/text()').get(),
+            link=response.meta["link"],
+            date_added=response.meta["date_added"],
+            description=remove_tags(
                 " ".join(response.xpath('//div[@class="description"]').get().split())
             ),
-            "image_url": response.xpath('//div[@class="imageBig"]/img/@src').get(),
-        }
-        yield data
+            image_url=response.xpath('//div[@class="imageBig"]/img/@src').get(),
+        )
 
 
 class AdresowoSpider(scrapy.Spider):
@@ -96,32 +84,23 @@ class AdresowoSpider(scrapy.Spider):
 
     @staticmethod
     def parse_advert_data(response):
-        data = {
-            "place": response.xpath('//span[@class="offer-header__city"]/text()')
+        yield AdvertsCrawlerItem(
+            place=response.xpath('//span[@class="offer-header__city"]/text()')
             .get()
             .strip(),
-            "county": "miński",
-            "price": response.xpath(
+            county="miński",
+            price=response.xpath(
                 '//div[@class="offer-summary__item offer-summary__item1"]/div/span/text()'
-            )
-            .get()
-            .replace(" ", "")
-            .replace(",", "."),
-            "price_per_m2": response.xpath(
+            ).get(),
+            price_per_m2=response.xpath(
                 '//div[@class="offer-summary__item offer-summary__item2"]/div/span/text()'
-            )
-            .get()
-            .replace(" ", "")
-            .replace(",", "."),
-            "area": response.xpath(
+            ).get(),
+            area=response.xpath(
                 '//div[@class="offer-summary__item offer-summary__item1"]/div[2]/span/text()'
-            )
-            .get()
-            .replace(" ", "")
-            .replace(",", "."),
-            "link": response.meta["link"],
-            "date_added": "brak danych",
-            "description": remove_tags(
+            ).get(),
+            link=response.meta["link"],
+            date_added=None,
+            description=remove_tags(
                 " ".join(
                     response.xpath(
                         '//p[@class="offer-description__text offer-'
@@ -139,9 +118,8 @@ class AdresowoSpider(scrapy.Spider):
                     .split()
                 )
             ),
-            "image_url": response.xpath('//div[@class="offer-gallery"]/img/@src').get(),
-        }
-        yield data
+            image_url=response.xpath('//div[@class="offer-gallery"]/img/@src').get(),
+        )
 
 
 class StrzelczykSpider(scrapy.Spider):
@@ -165,42 +143,28 @@ class StrzelczykSpider(scrapy.Spider):
 
     @staticmethod
     def parse_advert_data(response):
-        data = {
-            "place": response.xpath(
-                '//li[@class="breadcrumb-item active"]/a/span/text()'
-            )
+        yield AdvertsCrawlerItem(
+            place=response.xpath('//li[@class="breadcrumb-item active"]/a/span/text()')
             .get()
             .strip(),
-            "county": "brak danych",
-            "price": response.xpath(
+            county="brak danych",
+            price=response.xpath(
                 '//div[@class="col-md-3 offer--shortcut__details cena"]/span[@class="offer--shortcut__span-value"]/text()'
-            )
-            .get()
-            .replace(" ", ""),
-            "price_per_m2": response.xpath(
+            ).get(),
+            price_per_m2=response.xpath(
                 '//div[@class="col-md-3 offer--shortcut__details cena_za"]/span[@class="offer--shortcut__span-value"]/text()'
-            )
-            .get()
-            .split()[0]
-            .replace(",", "."),
-            "area": "".join(
-                response.xpath(
-                    '//div[@class="col-md-3 offer--shortcut__details powierzchnia"]/span[@class="offer--shortcut__span-value"]/text()'
-                )
-                .get()
-                .replace(",", ".")
-                .replace("m²", "")
-                .split()
-            ),
-            "link": response.meta["link"],
-            "date_added": "brak danych",
-            "description": remove_tags(
+            ).get(),
+            area=response.xpath(
+                '//div[@class="col-md-3 offer--shortcut__details powierzchnia"]/span[@class="offer--shortcut__span-value"]/text()'
+            ).get(),
+            link=response.meta["link"],
+            date_added=None,
+            description=remove_tags(
                 " ".join(
                     response.xpath('//div[@class="section__text-group"]').get().split()
                 )
             ),
-            "image_url": response.xpath(
+            image_url=response.xpath(
                 '//div[@class="image-container"]/a/@href'
             ).get(),
-        }
-        yield data
+        )
@@ -1,5 +1,6 @@
 #!/bin/bash
 while true; do
+    python3 manage.py merge_favourites
     python3 manage.py makemigrations parcels
     python3 manage.py migrate
     if [[ "$?" == "0" ]]; then
@@ -8,4 +9,5 @@ while true; do
     echo Init command failed, retrying in 5 secs...
     sleep 5
 done
+python3 manage.py backfill_identities
 python3 manage.py runserver 0.0.0.0:8000
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Advert, Favourite
+from .models import Advert, Favourite, SavedSearch
 
 admin.site.register(Advert)
 admin.site.register(Favourite)
+admin.site.register(SavedSearch)
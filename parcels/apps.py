@@ -1,5 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ParcelsConfig(AppConfig):
     name = "parcels"
+
+    def ready(self):
+        from .signals import (
+            create_search_config,
+            create_statistics_view,
+            update_search_vectors,
+        )
+
+        post_migrate.connect(create_search_config, sender=self)
+        post_migrate.connect(update_search_vectors, sender=self)
+        post_migrate.connect(create_statistics_view, sender=self)
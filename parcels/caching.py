@@ -0,0 +1,171 @@
+import hashlib
+import json
+from datetime import datetime
+from functools import wraps
+from typing import *
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import Advert, Favourite
+
+GENERATION_CACHE_KEY = "data_generation"
+DATA_UPDATED_CACHE_KEY = "data_updated_at"
+RESPONSE_CACHE_KEY = "response:{}:{}:{}"
+FACETS_CACHE_KEY = "facets:{}:{}"
+
+
+def get_generation() -> int:
+    """ Returns the counter which changes every time new adverts are loaded. """
+
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        cache.add(GENERATION_CACHE_KEY, 1, timeout=None)
+        generation = cache.get(GENERATION_CACHE_KEY)
+    return generation
+
+
+def bump_generation() -> int:
+    """ Invalidates responses cached for the previous data. """
+
+    cache.set(DATA_UPDATED_CACHE_KEY, timezone.now(), timeout=None)
+    try:
+        return cache.incr(GENERATION_CACHE_KEY)
+    except ValueError:
+        cache.set(GENERATION_CACHE_KEY, 1, timeout=None)
+        return 1
+
+
+def get_data_updated_at() -> datetime:
+    """ Returns when adverts were loaded last time. """
+
+    updated_at = cache.get(DATA_UPDATED_CACHE_KEY)
+    if updated_at is None:
+        cache.add(DATA_UPDATED_CACHE_KEY, timezone.now(), timeout=None)
+        updated_at = cache.get(DATA_UPDATED_CACHE_KEY)
+    return updated_at
+
+
+def normalize_params(params: Dict) -> Dict:
+    """ Returns adverts filters in one form, so equivalent urls share the cache. """
+
+    def text(value: Union[str, None]) -> str:
+        return "" if value in (None, "", "None") else value
+
+    return {
+        "place": text(params.get("place")),
+        "price": Advert.convert_input(params.get("price", 0), int) or 0,
+        "area": Advert.convert_input(params.get("area", 0), int) or 0,
+        "radius": Advert.convert_input(params.get("radius", 0), int) or 0,
+        "search_text": text(params.get("search_text")),
+        "page": Advert.convert_input(params.get("page", 1), int) or 1,
+        "cursor": text(params.get("cursor")),
+    }
+
+
+def get_response_cache_key(request: WSGIRequest) -> str:
+    params = json.dumps(normalize_params(request.GET), sort_keys=True)
+    return RESPONSE_CACHE_KEY.format(
+        request.path, get_generation(), hashlib.md5(params.encode()).hexdigest()
+    )
+
+
+def get_facets(adverts: Any, params: Dict) -> Dict:
+    """
+    Returns facets of the filtered adverts cached per filters until new adverts
+    are loaded. Pages of the same search share the facets.
+    """
+
+    filters = normalize_params(params)
+    del filters["page"], filters["cursor"]
+    filters = json.dumps(filters, sort_keys=True)
+    key = FACETS_CACHE_KEY.format(
+        get_generation(), hashlib.md5(filters.encode()).hexdigest()
+    )
+    facets = cache.get(key)
+    if facets is None:
+        if isinstance(adverts, QuerySet):
+            facets = Advert.get_facets(adverts)
+        else:
+            facets = adverts.facets()
+        cache.set(key, facets, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+    return facets
+
+
+def cache_for_anonymous(view: Callable) -> Callable:
+    """
+    Caches GET responses rendered for anonymous users until new adverts are loaded.
+    Responses with flash messages are not cached.
+    """
+
+    @wraps(view)
+    def wrapper(request: WSGIRequest, *args, **kwargs) -> HttpResponse:
+        if request.user.is_authenticated or len(messages.get_messages(request)):
+            return view(request, *args, **kwargs)
+
+        key = get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view(request, *args, **kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        if response.status_code == 200:
+            cache.set(
+                key,
+                (response.content, response["Content-Type"]),
+                timeout=settings.RESPONSE_CACHE_TIMEOUT,
+            )
+        return response
+
+    return wrapper
+
+
+def get_last_modified(
+    request: WSGIRequest, *args, **kwargs
+) -> Union[datetime, None]:
+    """
+    Returns the time of the last data load, or of the last change of
+    user's favourites if it is later. Returns None for responses with
+    flash messages, so they are always rendered.
+    """
+
+    if len(messages.get_messages(request)):
+        return None
+    last_modified = get_data_updated_at()
+    if request.user.is_authenticated:
+        favourites_updated_at = Favourite.get_updated_at(request.user.id)
+        if favourites_updated_at is not None:
+            last_modified = max(last_modified, favourites_updated_at)
+    return last_modified
+
+
+def get_etag(request: WSGIRequest, *args, **kwargs) -> Union[str, None]:
+    """
+    Returns ETag built from the data generation and user's favourites.
+    It does not depend on the session, which is not updated by 304 responses.
+    """
+
+    if len(messages.get_messages(request)):
+        return None
+    parts = [get_generation(), get_data_updated_at().isoformat()]
+    if request.user.is_authenticated:
+        favourites_updated_at = Favourite.get_updated_at(request.user.id)
+        parts += [
+            request.user.id,
+            favourites_updated_at and favourites_updated_at.isoformat(),
+        ]
+    return hashlib.md5(json.dumps(parts).encode()).hexdigest()
+
+
+conditional_get = condition(
+    etag_func=get_etag, last_modified_func=get_last_modified
+)
@@ -0,0 +1,167 @@
+import csv
+import json
+import tempfile
+from io import StringIO
+from typing import *
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db.models import QuerySet
+from openpyxl import Workbook
+
+COLUMNS = (
+    "place",
+    "county",
+    "price",
+    "price_per_m2",
+    "area",
+    "link",
+    "date_added",
+)
+HEADER = (
+    "Miejscowość",
+    "Powiat",
+    "Cena",
+    "Cena za m2",
+    "Powierzchnia",
+    "Link",
+    "Data dodania",
+)
+
+EXPORTERS = {}
+
+
+def register_exporter(name: str) -> Callable:
+    """ Registers the exporter class under the format name used in query parameters. """
+
+    def decorator(exporter_class: Type["Exporter"]) -> Type["Exporter"]:
+        EXPORTERS[name] = exporter_class
+        return exporter_class
+
+    return decorator
+
+
+def get_exporter(name: str, chunk_size: int = 2000) -> "Exporter":
+    """ Returns the exporter of given format. Raises KeyError if it does not exist. """
+
+    return EXPORTERS[name](chunk_size=chunk_size)
+
+
+class Exporter:
+    """
+    Base class for adverts exporters. Subclasses implement either stream,
+    if the format can be written row by row, or write, if the whole file
+    has to be built before sending.
+    """
+
+    extension = None
+    content_type = None
+    spool_size = 10 * 1024 * 1024
+    block_size = 64 * 1024
+
+    def __init__(self, chunk_size: int = 2000):
+        self.chunk_size = chunk_size
+
+    @property
+    def filename(self) -> str:
+        return f"your_adverts.{self.extension}"
+
+    def rows(self, adverts: QuerySet) -> Iterator[Tuple]:
+        """ Yields exported columns fetched with a server-side cursor. """
+
+        return adverts.values_list(*COLUMNS).iterator(chunk_size=self.chunk_size)
+
+    def batches(self, adverts: QuerySet) -> Iterator[List[Tuple]]:
+        batch = []
+        for row in self.rows(adverts):
+            batch.append(row)
+            if len(batch) == self.chunk_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def stream(self, adverts: QuerySet) -> Iterator[bytes]:
+        with tempfile.SpooledTemporaryFile(max_size=self.spool_size) as file:
+            self.write(adverts, file)
+            file.seek(0)
+            yield from iter(lambda: file.read(self.block_size), b"")
+
+    def write(self, adverts: QuerySet, file: BinaryIO) -> None:
+        for chunk in self.stream(adverts):
+            file.write(chunk)
+
+
+@register_exporter("csv")
+class CsvExporter(Exporter):
+    extension = "csv"
+    content_type = "text/csv"
+
+    def stream(self, adverts: QuerySet) -> Iterator[bytes]:
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(HEADER)
+        for batch in self.batches(adverts):
+            writer.writerows(batch)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode()
+
+
+@register_exporter("jsonl")
+class JsonLinesExporter(Exporter):
+    extension = "jsonl"
+    content_type = "application/x-ndjson"
+
+    def stream(self, adverts: QuerySet) -> Iterator[bytes]:
+        for batch in self.batches(adverts):
+            yield "".join(
+                json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n"
+                for row in batch
+            ).encode()
+
+
+@register_exporter("parquet")
+class ParquetExporter(Exporter):
+    extension = "parquet"
+    content_type = "application/vnd.apache.parquet"
+    schema = pa.schema(
+        [
+            ("place", pa.string()),
+            ("county", pa.string()),
+            ("price", pa.float64()),
+            ("price_per_m2", pa.float64()),
+            ("area", pa.float64()),
+            ("link", pa.string()),
+            ("date_added", pa.string()),
+        ]
+    )
+
+    def write(self, adverts: QuerySet, file: BinaryIO) -> None:
+        writer = pq.ParquetWriter(file, self.schema)
+        try:
+            for batch in self.batches(adverts):
+                columns = [
+                    pa.array(values, type=field.type)
+                    for values, field in zip(zip(*batch), self.schema)
+                ]
+                writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+        finally:
+            writer.close()
+
+
+@register_exporter("xlsx")
+class XlsxExporter(Exporter):
+    extension = "xlsx"
+    content_type = (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+
+    def write(self, adverts: QuerySet, file: BinaryIO) -> None:
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Działki")
+        sheet.append(HEADER)
+        for row in self.rows(adverts):
+            sheet.append(row)
+        workbook.save(file)
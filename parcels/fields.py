@@ -1,17 +1,31 @@
 from django import forms
+from django.core.cache import cache
+from django.utils.html import format_html, format_html_join
 
 
 class ListTextWidget(forms.TextInput):
-    def __init__(self, data_list, name, *args, **kwargs):
+    def __init__(self, data_list, name, cache_key=None, *args, **kwargs):
         super(ListTextWidget, self).__init__(*args, **kwargs)
         self._name = name
-        self._list = data_list
+        self._list = data_list or ()
+        self._cache_key = cache_key
         self.attrs.update({"list": "list__%s" % self._name})
 
+    def render_data_list(self) -> str:
+        return format_html(
+            '<datalist id="list__{}">{}</datalist>',
+            self._name,
+            format_html_join(
+                "", '<option value="{}">', ((item,) for item in self._list)
+            ),
+        )
+
     def render(self, name, value, attrs=None, renderer=None):
         text_html = super(ListTextWidget, self).render(name, value, attrs=attrs)
-        data_list = '<datalist id="list__%s">' % self._name
-        for item in self._list:
-            data_list += '<option value="%s">' % item
-        data_list += "</datalist>"
+        if self._cache_key is None:
+            data_list = self.render_data_list()
+        else:
+            data_list = cache.get_or_set(
+                self._cache_key, self.render_data_list, timeout=None
+            )
         return text_html + data_list
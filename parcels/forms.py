@@ -3,7 +3,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
 
 from .fields import ListTextWidget
-from .models import Advert
+from .models import Advert, PLACES_DATALIST_CACHE_KEY
 from .validators import validate_positive
 
 
@@ -26,17 +26,25 @@ class AdvertForm(forms.Form):
         required=False,
         validators=[validate_positive],
     )
+    radius = forms.IntegerField(
+        label="Odległość",
+        help_text="Podaj odległość od miejscowości w kilometrach",
+        required=False,
+        validators=[validate_positive],
+    )
 
     def __init__(self, *args, **kwargs):
         _data_list = kwargs.pop("data_list", None)
         super().__init__(*args, **kwargs)
         self.fields["place"].widget = ListTextWidget(
-            data_list=_data_list, name="place-list"
+            data_list=_data_list,
+            name="place-list",
+            cache_key=PLACES_DATALIST_CACHE_KEY if _data_list is not None else None,
         )
 
     class Meta:
         model = Advert
-        fields = ("place", "price", "area")
+        fields = ("place", "price", "area", "radius")
 
     def clean(self):
         data = super().clean()
@@ -0,0 +1,50 @@
+import csv
+import math
+import os
+from functools import lru_cache
+from typing import *
+
+GAZETTEER_FILE = os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv")
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def normalize_place(place: str) -> str:
+    return " ".join(place.split()).lower()
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer() -> Dict[str, Tuple[float, float]]:
+    """ Loads coordinates of places bundled with the application. """
+
+    with open(GAZETTEER_FILE, encoding="utf-8") as file:
+        return {
+            normalize_place(row["place"]): (
+                float(row["latitude"]),
+                float(row["longitude"]),
+            )
+            for row in csv.DictReader(file)
+        }
+
+
+def locate(place: Union[str, None]) -> Union[Tuple[float, float], None]:
+    """ Returns (latitude, longitude) of the place or None if it is unknown. """
+
+    if not place:
+        return None
+    return load_gazetteer().get(normalize_place(place))
+
+
+def bounding_box(
+    latitude: float, longitude: float, radius: float
+) -> Tuple[float, float, float, float]:
+    """ Returns (min_lat, max_lat, min_lon, max_lon) of the square around the circle. """
+
+    lat_delta = radius / KM_PER_DEGREE
+    lon_delta = radius / (KM_PER_DEGREE * math.cos(math.radians(latitude)))
+    return (
+        latitude - lat_delta,
+        latitude + lat_delta,
+        longitude - lon_delta,
+        longitude + lon_delta,
+    )
@@ -6,49 +6,24 @@ from django.db.models import QuerySet
 from parcels.models import Advert, Favourite
 
 
-class Echo:
-    """ Helper class for streaming csv file. """
+def filter_adverts(user_id: int, view_name: str, params: Dict) -> QuerySet:
+    """ Returns adverts shown in the view with given query parameters. """
 
-    @staticmethod
-    def write(value):
-        return value
-
-
-def prepare_csv(adverts: QuerySet) -> List:
-    rows = [
-        [
-            "Miejscowość",
-            "Powiat",
-            "Cena",
-            "Cena za m2",
-            "Powierzchnia",
-            "Link",
-            "Data dodania",
-        ]
-    ]
-    for adv in adverts:
-        row = [
-            adv.place,
-            adv.county,
-            adv.price,
-            adv.price_per_m2,
-            adv.area,
-            adv.link,
-            adv.date_added,
-        ]
-        rows.append(row)
-    return rows
+    if view_name == "favourites":
+        search_text = params.get("search_text", None)
+        return Favourite.get_favourites(user_id=user_id, search_text=search_text)
+    return Advert.filter_adverts(
+        place=params.get("place", None),
+        price=params.get("price", 0),
+        area=params.get("area", 0),
+        search_text=params.get("search_text", None),
+        radius=params.get("radius", 0),
+    )
 
 
 def get_adverts(request: WSGIRequest) -> QuerySet:
-    if request.session.get("view_name", None) == "favourites":
-        search_text = request.GET.get("search_text", None)
-        return Favourite.get_favourites(
-            user_id=request.user.id, search_text=search_text
-        )
-    return Advert.filter_adverts(
-        place=request.GET.get("place", None),
-        price=request.GET.get("price", 0),
-        area=request.GET.get("area", 0),
-        search_text=request.GET.get("search_text", None),
+    return filter_adverts(
+        user_id=request.user.id,
+        view_name=request.GET.get("view", None),
+        params=request.GET.dict(),
     )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from parcels.models import Advert
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes duplicates of adverts saved without identity and sets it. "
+        "Run it after migrating, so the next crawl skips existing adverts."
+    )
+
+    def handle(self, *args, **options):
+        updated = Advert.backfill_identities()
+        self.stdout.write(self.style.SUCCESS(f"Set identity of {updated} adverts."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from parcels.models import Advert
+
+
+class Command(BaseCommand):
+    help = "Runs EXPLAIN ANALYZE on the common advert list filters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--place", help="Place used in filters.")
+        parser.add_argument("--price", type=int, default=300000)
+        parser.add_argument("--area", type=int, default=1000)
+        parser.add_argument("--search_text", default="media")
+        parser.add_argument(
+            "--limit", type=int, default=15, help="Size of the explained page."
+        )
+
+    def handle(self, *args, **options):
+        place = options["place"] or Advert.objects.values_list(
+            "place", flat=True
+        ).first()
+        price = options["price"]
+        area = options["area"]
+        filters = {
+            "all adverts": dict(place=None, price=0, area=0),
+            "place": dict(place=place, price=0, area=0),
+            "price and area": dict(place=None, price=price, area=area),
+            "place, price and area": dict(place=place, price=price, area=area),
+            "description search": dict(
+                place=None, price=0, area=0, search_text=options["search_text"]
+            ),
+        }
+        for name, kwargs in filters.items():
+            queryset = Advert.filter_adverts(**kwargs)[: options["limit"]]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {kwargs}"))
+            self.stdout.write(queryset.explain(analyze=True))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from parcels.models import Advert
+
+
+class Command(BaseCommand):
+    help = "Sets coordinates of adverts loaded before they were geocoded."
+
+    def handle(self, *args, **options):
+        updated = Advert.geocode()
+        self.stdout.write(self.style.SUCCESS(f"Geocoded {updated} adverts."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from parcels.models import Favourite
+
+
+class Command(BaseCommand):
+    help = (
+        "Merges duplicate favourites of the same user. "
+        "Run it before migrating to the unique favourites per user."
+    )
+
+    def handle(self, *args, **options):
+        deleted = Favourite.merge_duplicates()
+        self.stdout.write(self.style.SUCCESS(f"Merged {deleted} duplicates."))
@@ -1,10 +1,15 @@
+from django.utils.functional import SimpleLazyObject
+
 from .models import Favourite
 
 
 def get_saved_adverts(get_response):
     def process_view(request):
         if request.user.is_authenticated:
-            request.saved_adverts = Favourite.get_favourites(user_id=request.user.id)
+            user_id = request.user.id
+            request.saved_adverts = SimpleLazyObject(
+                lambda: Favourite.get_saved_ids(user_id)
+            )
         response = get_response(request)
         return response
 
@@ -1,21 +1,70 @@
 import glob
+import hashlib
 import logging
+import math
 import os
+import time
+from collections import Counter
+from datetime import date, datetime
 from typing import *
 
 import pandas as pd
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
-from django.db import models, transaction
-from django.db.models import QuerySet
-from django.db.utils import ProgrammingError
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    FloatField,
+    IntegerField,
+    Max,
+    QuerySet,
+    Value,
+    When,
+)
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+from django.db.utils import IntegrityError, ProgrammingError
+from django.utils import timezone
+
+from .gazetteer import EARTH_RADIUS_KM, bounding_box, locate
 
 logging.basicConfig(level=logging.DEBUG)
 
+PLACES_CACHE_KEY = "advert_places"
+PLACES_DATALIST_CACHE_KEY = "advert_places_datalist"
+SAVED_ADVERTS_CACHE_KEY = "saved_adverts_{}"
+FAVOURITES_UPDATED_CACHE_KEY = "favourites_updated_{}"
+
 
 class Advert(models.Model):
     """ Stores scraped adverts data. """
 
+    CSV_FIELDS = (
+        "place",
+        "county",
+        "price",
+        "price_per_m2",
+        "area",
+        "link",
+        "date_added",
+        "description",
+        "image_url",
+    )
+    NUMERIC_FIELDS = ("price", "price_per_m2", "area")
+    IDENTITY_FIELDS = ("place", "price", "price_per_m2", "area")
+    DATE_FORMAT = "%d/%m/%Y"
+    PRICE_FACETS = (50000, 100000, 200000, 300000, 500000)
+    AREA_FACETS = (500, 1000, 1500, 3000, 5000)
+
     place = models.CharField(max_length=250, null=True)
     county = models.CharField(max_length=250, null=True)
     price = models.FloatField(null=True)
@@ -25,12 +74,83 @@ class Advert(models.Model):
     date_added = models.CharField(max_length=50, null=True)
     description = models.TextField(null=True)
     image_url = models.CharField(max_length=500, null=True)
+    identity = models.CharField(max_length=64, unique=True, null=True)
+    search_vector = SearchVectorField(null=True)
+    latitude = models.FloatField(null=True)
+    longitude = models.FloatField(null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"]),
+            models.Index(fields=["place", "price"]),
+            models.Index(fields=["price", "area"]),
+            models.Index(fields=["latitude", "longitude"]),
+        ]
 
     def __repr__(self):
         return "place: {}, price: {} PLN, area: {} PLN/m2".format(
             self.place, self.price, self.area
         )
 
+    def save(self, *args, **kwargs) -> None:
+        if self.identity is None:
+            self.identity = self.get_identity()
+        if self.latitude is None:
+            self.latitude, self.longitude = locate(self.place) or (None, None)
+        super().save(*args, **kwargs)
+        type(self).objects.filter(pk=self.pk).update(
+            search_vector=self.description_vector()
+        )
+
+    @classmethod
+    def geocode(cls) -> int:
+        """
+        Sets coordinates of adverts loaded without them from the gazetteer.
+
+        :return: Amount of updated adverts.
+        """
+
+        updated = 0
+        places = (
+            cls.objects.filter(latitude__isnull=True, place__isnull=False)
+            .values_list("place", flat=True)
+            .distinct()
+        )
+        for place in list(places):
+            point = locate(place)
+            if point:
+                updated += cls.objects.filter(
+                    place=place, latitude__isnull=True
+                ).update(latitude=point[0], longitude=point[1])
+        return updated
+
+    @staticmethod
+    def description_vector() -> SearchVector:
+        return SearchVector("description", config=settings.SEARCH_CONFIG)
+
+    @classmethod
+    def update_search_vectors(
+        cls,
+        refresh: bool = False,
+        using: str = "default",
+        identities: Iterable[str] = None,
+    ) -> int:
+        """
+        Computes search vectors of adverts inserted without them.
+
+        :param refresh: Recompute vectors of all adverts, e.g. after changing SEARCH_CONFIG.
+        :param using: Alias of the database.
+        :param identities: Limit the update to adverts with these identities,
+            so inserting a batch does not scan the whole table.
+        """
+
+        adverts = cls.objects.using(using)
+        if not refresh:
+            adverts = adverts.filter(search_vector__isnull=True)
+        if identities is not None:
+            adverts = adverts.filter(identity__in=list(identities))
+        return adverts.update(search_vector=cls.description_vector())
+
     @classmethod
     def create(cls, item: list) -> None:
         """ Creates an Advert instance. """
@@ -49,13 +169,135 @@ class Advert(models.Model):
                 ).save()
         except ValueError as e:
             logging.error(e)
+        except IntegrityError:
+            logging.info(f"Skipped existing advert: {item}")
+
+    @staticmethod
+    def make_identity(values: Sequence) -> str:
+        """ Returns a hash which identifies the same advert in subsequent crawls. """
+
+        key = "|".join(str(value) for value in values)
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get_identity(self) -> str:
+        """ Returns the identity with numeric fields parsed as in csv rows. """
+
+        values = []
+        for field in self.IDENTITY_FIELDS:
+            value = getattr(self, field)
+            if field in self.NUMERIC_FIELDS and value is not None:
+                value = float(value)
+            values.append(value)
+        return self.make_identity(values)
+
+    @classmethod
+    def backfill_identities(cls, batch_size: int = 1000) -> int:
+        """
+        Sets identity of adverts saved before it was introduced. Their duplicates
+        are deleted first, so they do not conflict on the unique identity.
+
+        :return: Amount of updated adverts.
+        """
+
+        if not cls.objects.filter(identity__isnull=True).exists():
+            return 0
+        with transaction.atomic():
+            cls.delete_duplicates()
+            adverts = list(
+                cls.objects.filter(identity__isnull=True).only(
+                    "id", *cls.IDENTITY_FIELDS
+                )
+            )
+            for advert in adverts:
+                advert.identity = advert.get_identity()
+            cls.objects.bulk_update(adverts, ["identity"], batch_size=batch_size)
+        logging.info(f"Set identity of {len(adverts)} adverts.")
+        return len(adverts)
+
+    @classmethod
+    def parse_row(cls, item: Sequence) -> Union["Advert", None]:
+        """
+        Builds an unsaved Advert instance from the csv row or normalized item.
+        Returns None if the row has not numeric values in numeric fields.
+        """
+
+        data = {
+            field: None if pd.isna(value) else value
+            for field, value in zip(cls.CSV_FIELDS, item)
+        }
+        try:
+            for field in cls.NUMERIC_FIELDS:
+                if data[field] is not None and not isinstance(data[field], float):
+                    data[field] = float(data[field])
+        except (TypeError, ValueError):
+            return None
+        if isinstance(data["date_added"], date):
+            data["date_added"] = data["date_added"].strftime(cls.DATE_FORMAT)
+        data["latitude"], data["longitude"] = locate(data["place"]) or (None, None)
+        advert = cls(**data)
+        advert.identity = advert.get_identity()
+        return advert
 
     @classmethod
-    def load_adverts(cls, catalog: str) -> None:
+    def insert_rows(cls, rows: Iterable[Sequence], batch_size: int) -> int:
+        """
+        Inserts rows ordered as CSV_FIELDS skipping adverts which already exist.
+        Rows which fail validation are saved one by one with create method.
+
+        :return: Amount of valid rows processed in bulk.
+        """
+
+        adverts = []
+        for item in rows:
+            advert = cls.parse_row(item)
+            if advert is None:
+                cls.create(item)
+            else:
+                adverts.append(advert)
+        cls.objects.bulk_create(adverts, batch_size=batch_size, ignore_conflicts=True)
+        cls.update_search_vectors(identities=[advert.identity for advert in adverts])
+        cls.add_places(advert.place for advert in adverts)
+        return len(adverts)
+
+    @classmethod
+    def save_items(cls, items: List[Dict], batch_size: int = 1000) -> int:
+        """ Saves items yielded by the spiders in one transaction. """
+
+        rows = [[item.get(field) for field in cls.CSV_FIELDS] for item in items]
+        with transaction.atomic():
+            return cls.insert_rows(rows, batch_size)
+
+    @classmethod
+    def bulk_load(cls, file: str, batch_size: int) -> int:
+        """
+        Loads adverts from the csv file in batches within one transaction.
+        Adverts which already exist in the database are skipped by their identity.
+
+        :param file: Path to the csv file.
+        :param batch_size: Amount of rows parsed and inserted at once.
+        :return: Amount of valid rows processed in bulk.
+        """
+
+        start = time.perf_counter()
+        loaded = 0
+        with transaction.atomic():
+            for chunk in pd.read_csv(file, chunksize=batch_size):
+                loaded += cls.insert_rows(chunk.values, batch_size)
+        elapsed = time.perf_counter() - start
+        logging.info(
+            "Processed {} adverts from {} in {:.2f}s ({:.0f} rows/s).".format(
+                loaded, file, elapsed, loaded / elapsed if elapsed else loaded
+            )
+        )
+        return loaded
+
+    @classmethod
+    def load_adverts(cls, catalog: str, batch_size: int = 1000) -> None:
         """
         Loads data from files and saves to the database.
 
         :param catalog: Catalog name with files to be added.
+        :param batch_size: Amount of rows inserted at once.
         """
 
         path = os.path.join(catalog, "*.csv")
@@ -63,10 +305,8 @@ class Advert(models.Model):
 
         if files:
             for file in files:
-                adv = pd.read_csv(file)
                 try:
-                    for item in adv.values:
-                        cls.create(item)
+                    cls.bulk_load(file, batch_size)
                 except ProgrammingError:
                     raise ProgrammingError(
                         "You have to make migrations before add data to database."
@@ -76,26 +316,53 @@ class Advert(models.Model):
         logging.info("Data successfully updated.")
 
     @classmethod
-    def delete_duplicates(cls) -> None:
-        """ Deletes duplicate objects from the database. """
+    def delete_duplicates(cls) -> int:
+        """
+        Deletes duplicate objects from the database with a single statement,
+        keeping the oldest advert of each group.
 
-        min_id_objects = cls.objects.values(
-            "place", "price", "price_per_m2", "area"
-        ).annotate(minid=models.Min("id"))
-        min_ids = [obj["minid"] for obj in min_id_objects]
+        :return: Amount of deleted adverts.
+        """
 
-        cls.objects.exclude(id__in=min_ids).delete()
+        advert_table = cls._meta.db_table
+        favourite_table = Favourite.adverts.through._meta.db_table
+        group_by = ", ".join(cls.IDENTITY_FIELDS)
+        sql = f"""
+            WITH duplicates AS (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY {group_by} ORDER BY id
+                    ) AS position
+                    FROM {advert_table}
+                ) AS ranked
+                WHERE position > 1
+            ), unlinked AS (
+                DELETE FROM {favourite_table}
+                WHERE advert_id IN (SELECT id FROM duplicates)
+            )
+            DELETE FROM {advert_table} WHERE id IN (SELECT id FROM duplicates)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            deleted = cursor.rowcount
 
         logging.info(
-            "Amount of adverts after deleting duplicates: {}".format(
-                len(cls.objects.all())
+            "Deleted {} duplicates, amount of adverts: {}".format(
+                deleted, cls.objects.count()
             )
         )
+        return deleted
 
     @classmethod
     def get_advert(cls, _id: int):
         return cls.objects.filter(id=_id)
 
+    @classmethod
+    def get_last_id(cls) -> int:
+        """ Returns the highest advert id, so adverts inserted later can be found. """
+
+        return cls.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+
     @staticmethod
     def convert_input(value: Any, to_type: Any) -> Any:
         try:
@@ -110,14 +377,22 @@ class Advert(models.Model):
         price: Union[str, int],
         area: Union[str, int],
         search_text: str = None,
+        radius: Union[str, int] = 0,
     ) -> QuerySet:
-        """ Returns objects filtered by place, price and area ordered by price. """
+        """
+        Returns objects filtered by place, price and area ordered by price.
+        If radius is given, returns adverts within radius kilometres from the place.
+        """
 
         price = cls.convert_input(price, int)
         area = cls.convert_input(area, int)
+        radius = cls.convert_input(radius, int)
+        center = locate(place) if radius and radius > 0 else None
 
         adverts = cls.objects.all().order_by("price")
-        if place and place != "None":
+        if center:
+            adverts = cls.filter_by_distance(adverts, *center, radius)
+        elif place and place != "None":
             adverts = adverts.filter(place=place).order_by("price")
         if price and price != 0:
             adverts = adverts.filter(price__lte=price).order_by("price")
@@ -126,33 +401,149 @@ class Advert(models.Model):
         adverts = cls.search_by_description(adverts, search_text)
         return adverts
 
+    @staticmethod
+    def filter_by_distance(
+        adverts: QuerySet, latitude: float, longitude: float, radius: float
+    ) -> QuerySet:
+        """
+        Returns adverts within radius kilometres from the point.
+        The bounding box is resolved with the coordinates index
+        and the exact haversine distance is checked only for adverts within it.
+        """
+
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius)
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        distance = (
+            2
+            * EARTH_RADIUS_KM
+            * ASin(
+                Sqrt(
+                    Power(Sin((Radians(F("latitude")) - lat) / 2), 2)
+                    + math.cos(lat)
+                    * Cos(Radians(F("latitude")))
+                    * Power(Sin((Radians(F("longitude")) - lon) / 2), 2)
+                )
+            )
+        )
+        return adverts.filter(
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lon, max_lon),
+        ).annotate(distance=distance).filter(distance__lte=radius)
+
     @staticmethod
     def search_by_description(adverts: QuerySet, search_text: str) -> QuerySet:
         if search_text and search_text != "None":
-            vector = SearchVector("description")
-            query = SearchQuery(search_text)
+            query = SearchQuery(search_text, config=settings.SEARCH_CONFIG)
             adverts = (
-                adverts.annotate(search=vector, rank=SearchRank(vector, query))
-                .filter(search=search_text)
+                adverts.filter(search_vector=query)
+                .annotate(
+                    rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+                )
                 .order_by("-rank")
             )
         return adverts
 
+    @classmethod
+    def get_facets(cls, adverts: QuerySet) -> Dict:
+        """
+        Returns counts of adverts per place and per the price and area
+        thresholds of the search form. Adverts are grouped by place and
+        by the narrowest threshold they meet in one aggregate query.
+        """
+
+        price_bucket = Case(
+            *[
+                When(price__lte=limit, then=Value(limit))
+                for limit in cls.PRICE_FACETS
+            ],
+            output_field=IntegerField(),
+        )
+        area_bucket = Case(
+            *[
+                When(area__gte=limit, then=Value(limit))
+                for limit in reversed(cls.AREA_FACETS)
+            ],
+            output_field=IntegerField(),
+        )
+        rows = (
+            adverts.order_by()
+            .annotate(price_bucket=price_bucket, area_bucket=area_bucket)
+            .values_list("place", "price_bucket", "area_bucket")
+            .annotate(count=Count("id"))
+        )
+        return cls.count_facets(rows)
+
+    @classmethod
+    def count_facets(cls, rows: Iterable[Tuple]) -> Dict:
+        """
+        Sums (place, price_bucket, area_bucket, count) rows into facets.
+        Price counts include cheaper adverts and area counts include larger ones,
+        so they match the results of filtering by the threshold.
+        """
+
+        places, prices, areas = Counter(), Counter(), Counter()
+        for place, price_bucket, area_bucket, count in rows:
+            if place is not None:
+                places[place] += count
+            if price_bucket is not None:
+                prices[price_bucket] += count
+            if area_bucket is not None:
+                areas[area_bucket] += count
+        return {
+            "places": sorted(places.items(), key=lambda item: (-item[1], item[0])),
+            "prices": [
+                (limit, sum(prices[bucket] for bucket in prices if bucket <= limit))
+                for limit in cls.PRICE_FACETS
+            ],
+            "areas": [
+                (limit, sum(areas[bucket] for bucket in areas if bucket >= limit))
+                for limit in cls.AREA_FACETS
+            ],
+        }
+
     @classmethod
     def get_places(cls) -> Tuple:
-        return tuple(
-            set(
-                cls.objects.only("place")
-                .values_list("place", flat=True)
-                .order_by("place")
-            )
+        """ Returns sorted distinct places from the cache. """
+
+        places = cache.get(PLACES_CACHE_KEY)
+        if places is None:
+            places = cls.refresh_places()
+        return places
+
+    @classmethod
+    def refresh_places(cls) -> Tuple:
+        """ Computes distinct places in the database and stores them in the cache. """
+
+        places = tuple(
+            cls.objects.exclude(place__isnull=True)
+            .order_by("place")
+            .values_list("place", flat=True)
+            .distinct()
         )
+        cls.cache_places(places)
+        return places
+
+    @staticmethod
+    def cache_places(places: Tuple) -> None:
+        cache.set(PLACES_CACHE_KEY, places, timeout=None)
+        cache.delete(PLACES_DATALIST_CACHE_KEY)
+
+    @classmethod
+    def add_places(cls, places: Iterable[str]) -> None:
+        """ Adds places of newly inserted adverts to the cached places. """
+
+        cached_places = cache.get(PLACES_CACHE_KEY)
+        if cached_places is None:
+            return
+        new_places = set(places) - set(cached_places) - {None}
+        if new_places:
+            cls.cache_places(tuple(sorted(new_places.union(cached_places))))
 
 
 class Favourite(models.Model):
     """ Creates relationships between the user and its favourite adverts. """
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.OneToOneField(User, on_delete=models.CASCADE)
     adverts = models.ManyToManyField(Advert)
 
     def __repr__(self):
@@ -168,14 +559,73 @@ class Favourite(models.Model):
             return None
 
     @classmethod
-    def get_or_create(cls, user: User):
-        """ Gets the instance from the database if it exists. Otherwise creates the new one. """
+    def get_or_create(cls, user: User) -> "Favourite":
+        """
+        Gets the instance from the database if it exists. Otherwise creates the new one.
+        Both cases are handled by a single upsert, so concurrent calls can not
+        create duplicates.
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {cls._meta.db_table} (user_id) VALUES (%s) "
+                "ON CONFLICT (user_id) DO UPDATE SET user_id = EXCLUDED.user_id "
+                "RETURNING id",
+                [user.id],
+            )
+            fav_id = cursor.fetchone()[0]
+        return cls.from_db(connection.alias, ["id", "user_id"], [fav_id, user.id])
+
+    @classmethod
+    def merge_duplicates(cls) -> int:
+        """
+        Merges favourites of users who have more than one instance into the oldest one.
+        Needed once before the unique constraint on user is applied.
 
-        while True:
-            try:
-                return cls.objects.get(user=user)
-            except cls.DoesNotExist:
-                cls(user=user).save()
+        :return: Amount of deleted duplicates.
+        """
+
+        favourite_table = cls._meta.db_table
+        through_table = cls.adverts.through._meta.db_table
+        if favourite_table not in connection.introspection.table_names():
+            return 0
+        sql = f"""
+            WITH keepers AS (
+                SELECT user_id, min(id) AS id FROM {favourite_table}
+                GROUP BY user_id HAVING count(*) > 1
+            ), duplicates AS (
+                SELECT favourite.id, keepers.id AS keeper_id
+                FROM {favourite_table} AS favourite
+                JOIN keepers ON keepers.user_id = favourite.user_id
+                WHERE favourite.id <> keepers.id
+            ), moved AS (
+                INSERT INTO {through_table} (favourite_id, advert_id)
+                SELECT DISTINCT duplicates.keeper_id, through.advert_id
+                FROM {through_table} AS through
+                JOIN duplicates ON duplicates.id = through.favourite_id
+                ON CONFLICT DO NOTHING
+            ), unlinked AS (
+                DELETE FROM {through_table}
+                WHERE favourite_id IN (SELECT id FROM duplicates)
+            )
+            DELETE FROM {favourite_table} WHERE id IN (SELECT id FROM duplicates)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.rowcount
+
+    @classmethod
+    def add_from_queryset(cls, fav: "Favourite", adverts: QuerySet) -> None:
+        """ Adds adverts selected by the queryset with a single INSERT ... SELECT. """
+
+        through_table = cls.adverts.through._meta.db_table
+        sql, params = adverts.order_by().values("id").query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {through_table} (favourite_id, advert_id) "
+                f"SELECT %s, id FROM ({sql}) AS adverts ON CONFLICT DO NOTHING",
+                [fav.id, *params],
+            )
 
     @classmethod
     def add_to_favourite(cls, user_id: int, adverts: Union[list, QuerySet]) -> None:
@@ -184,8 +634,11 @@ class Favourite(models.Model):
         user = cls.get_user(user_id)
         if user:
             fav = cls.get_or_create(user)
-            [fav.adverts.add(advert) for advert in adverts]
-            fav.save()
+            if isinstance(adverts, QuerySet):
+                cls.add_from_queryset(fav, adverts)
+            else:
+                fav.adverts.add(*adverts)
+            cls.mark_updated(user_id)
 
     @classmethod
     def remove_from_favourite(
@@ -198,7 +651,41 @@ class Favourite(models.Model):
         except cls.DoesNotExist:
             pass
         else:
-            [fav.adverts.remove(advert) for advert in adverts]
+            if isinstance(adverts, QuerySet):
+                cls.adverts.through.objects.filter(
+                    favourite=fav, advert_id__in=adverts.order_by().values("id")
+                ).delete()
+            else:
+                fav.adverts.remove(*adverts)
+            cls.mark_updated(user_id)
+
+    @staticmethod
+    def mark_updated(user_id: int) -> None:
+        """ Invalidates cached saved ids and records when user's favourites changed. """
+
+        cache.delete(SAVED_ADVERTS_CACHE_KEY.format(user_id))
+        cache.set(FAVOURITES_UPDATED_CACHE_KEY.format(user_id), timezone.now(), None)
+
+    @staticmethod
+    def get_updated_at(user_id: int) -> Union[datetime, None]:
+        """ Returns when user's favourites changed last time, if it is known. """
+
+        return cache.get(FAVOURITES_UPDATED_CACHE_KEY.format(user_id))
+
+    @classmethod
+    def get_saved_ids(cls, user_id: int) -> FrozenSet[int]:
+        """ Returns ids of user's favourites adverts, cached until they change. """
+
+        key = SAVED_ADVERTS_CACHE_KEY.format(user_id)
+        saved_ids = cache.get(key)
+        if saved_ids is None:
+            saved_ids = frozenset(
+                cls.adverts.through.objects.filter(
+                    favourite__user_id=user_id
+                ).values_list("advert_id", flat=True)
+            )
+            cache.set(key, saved_ids, timeout=None)
+        return saved_ids
 
     @classmethod
     def get_favourites(cls, user_id: int, search_text: str = None) -> QuerySet:
@@ -207,5 +694,116 @@ class Favourite(models.Model):
         try:
             adverts = cls.objects.get(user__id=user_id).adverts.all()
         except cls.DoesNotExist:
-            return cls.objects.none()
+            return Advert.objects.none()
         return Advert.search_by_description(adverts, search_text)
+
+
+class SavedSearch(models.Model):
+    """ Stores adverts filters of the user notified about new matching adverts. """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    place = models.CharField(max_length=250, null=True)
+    price = models.IntegerField(default=0)
+    area = models.IntegerField(default=0)
+    search_text = models.CharField(max_length=250, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        parts = [self.place or "wszystkie miejscowości"]
+        if self.price:
+            parts.append(f"do {self.price} PLN")
+        if self.area:
+            parts.append(f"od {self.area} m2")
+        if self.search_text:
+            parts.append(f'"{self.search_text}"')
+        return ", ".join(parts)
+
+    @classmethod
+    def save_search(cls, user_id: int, params: Dict) -> "SavedSearch":
+        """ Saves filters of the adverts view unless the user saved them already. """
+
+        def text(value: Union[str, None]) -> Union[str, None]:
+            return None if value in (None, "", "None") else value
+
+        search, _ = cls.objects.get_or_create(
+            user_id=user_id,
+            place=text(params.get("place")),
+            price=Advert.convert_input(params.get("price", 0), int) or 0,
+            area=Advert.convert_input(params.get("area", 0), int) or 0,
+            search_text=text(params.get("search_text")),
+        )
+        return search
+
+    @classmethod
+    def match_adverts(cls, after_id: int) -> Dict["SavedSearch", List[Advert]]:
+        """
+        Matches all saved searches against adverts inserted after the given id
+        with a single join, instead of filtering all adverts once per search.
+
+        :param after_id: The highest advert id before the new adverts were loaded.
+        :return: New adverts ordered by price for every search they match.
+        """
+
+        search_table = cls._meta.db_table
+        advert_table = Advert._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT search.id, advert.id
+                FROM {search_table} AS search
+                JOIN {advert_table} AS advert ON advert.id > %s
+                    AND (search.place IS NULL OR advert.place = search.place)
+                    AND (search.price = 0 OR advert.price <= search.price)
+                    AND (search.area = 0 OR advert.area >= search.area)
+                    AND (
+                        search.search_text IS NULL
+                        OR advert.search_vector
+                            @@ plainto_tsquery(%s::regconfig, search.search_text)
+                    )
+                ORDER BY search.id, advert.price, advert.id
+                """,
+                [after_id, settings.SEARCH_CONFIG],
+            )
+            pairs = cursor.fetchall()
+
+        searches = cls.objects.select_related("user").in_bulk(
+            {search_id for search_id, _ in pairs}
+        )
+        adverts = Advert.objects.in_bulk({advert_id for _, advert_id in pairs})
+        matches = {}
+        for search_id, advert_id in pairs:
+            matches.setdefault(searches[search_id], []).append(adverts[advert_id])
+        return matches
+
+
+class PlaceStatistics(models.Model):
+    """
+    Summary of adverts per place and county. Backed by a materialized view
+    created after migrations and refreshed when new adverts are loaded.
+    """
+
+    place = models.CharField(max_length=250, null=True)
+    county = models.CharField(max_length=250, null=True)
+    count = models.IntegerField()
+    min_price = models.FloatField(null=True)
+    median_price = models.FloatField(null=True)
+    avg_price = models.FloatField(null=True)
+    min_price_per_m2 = models.FloatField(null=True)
+    median_price_per_m2 = models.FloatField(null=True)
+    avg_price_per_m2 = models.FloatField(null=True)
+    min_area = models.FloatField(null=True)
+    max_area = models.FloatField(null=True)
+
+    class Meta:
+        managed = False
+        db_table = "parcels_place_statistics"
+        ordering = ("place", "county")
+
+    @classmethod
+    def refresh(cls) -> None:
+        """ Recomputes statistics without blocking reads of the previous ones. """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"REFRESH MATERIALIZED VIEW CONCURRENTLY {cls._meta.db_table}"
+            )
@@ -0,0 +1,152 @@
+import base64
+import json
+from typing import *
+
+from django.db.models import F, Q, QuerySet
+from django.http import Http404
+
+
+class KeysetPage:
+    """ Page of adverts found by seeking after the cursor instead of using OFFSET. """
+
+    def __init__(
+        self,
+        object_list: List,
+        number: int,
+        cursor: Union[str, None],
+        next_cursor: Union[str, None],
+        previous_cursor: Union[str, None],
+    ):
+        self.object_list = object_list
+        self.number = number
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self) -> int:
+        return self.number + 1
+
+    def previous_page_number(self) -> int:
+        return self.number - 1
+
+
+class KeysetPaginator:
+    """
+    Paginates adverts ordered by (price, id), or by (rank, id) when they are
+    searched by description. Skips COUNT(*) and OFFSET, so every page costs
+    the same no matter how deep the user goes.
+    """
+
+    def __init__(self, queryset: QuerySet, per_page: int):
+        self.queryset = queryset
+        self.per_page = per_page
+        if "rank" in queryset.query.annotations:
+            self.key, self.descending = "rank", True
+        else:
+            self.key, self.descending = "price", False
+
+    @staticmethod
+    def encode_cursor(value: Any, pk: int, number: int, backward: bool) -> str:
+        data = json.dumps([value, pk, number, backward]).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[Any, int, int, bool]:
+        try:
+            value, pk, number, backward = json.loads(
+                base64.urlsafe_b64decode(cursor.encode())
+            )
+        except (TypeError, ValueError):
+            raise Http404("Invalid cursor.")
+        if (
+            not (value is None or isinstance(value, (int, float)))
+            or isinstance(value, bool)
+            or not isinstance(pk, int)
+            or not isinstance(number, int)
+            or number < 1
+            or not isinstance(backward, bool)
+        ):
+            raise Http404("Invalid cursor.")
+        return value, pk, number, backward
+
+    def ordering(self, backward: bool) -> List:
+        key = F(self.key)
+        # null keys are always last in the forward ordering
+        if self.descending != backward:
+            key = key.desc(nulls_last=not backward, nulls_first=backward)
+        else:
+            key = key.asc(nulls_last=not backward, nulls_first=backward)
+        return [key, "-id" if backward else "id"]
+
+    def seek(self, value: Any, pk: int, backward: bool) -> Q:
+        """ Returns filter selecting adverts after (or before) the given key. """
+
+        is_null = Q(**{f"{self.key}__isnull": True})
+        if value is None:
+            if backward:
+                return ~is_null | Q(is_null, id__lt=pk)
+            return Q(is_null, id__gt=pk)
+        lookup = "lt" if self.descending != backward else "gt"
+        result = Q(**{f"{self.key}__{lookup}": value}) | Q(
+            **{self.key: value, f"id__{'lt' if backward else 'gt'}": pk}
+        )
+        if not backward:
+            result |= is_null
+        return result
+
+    def cursor_for(self, advert: Any, number: int, backward: bool) -> str:
+        return self.encode_cursor(
+            getattr(advert, self.key), advert.pk, number, backward
+        )
+
+    def page(self, cursor: Union[str, None]) -> KeysetPage:
+        queryset = self.queryset
+        number, backward = 1, False
+        if cursor:
+            value, pk, number, backward = self.decode_cursor(cursor)
+            queryset = queryset.filter(self.seek(value, pk, backward))
+        queryset = queryset.order_by(*self.ordering(backward))
+        object_list = list(queryset[: self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[: self.per_page]
+        if backward:
+            object_list.reverse()
+
+        next_cursor = previous_cursor = None
+        if object_list:
+            if backward or has_more:
+                next_cursor = self.cursor_for(object_list[-1], number + 1, False)
+            if (has_more or not backward) and cursor and number > 1:
+                previous_cursor = self.cursor_for(object_list[0], number - 1, True)
+        return KeysetPage(object_list, number, cursor, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    Replaces offset pagination of ListView with KeysetPaginator
+    when keyset_pagination is set.
+    """
+
+    keyset_pagination = False
+
+    def paginate_queryset(self, queryset: QuerySet, page_size: int) -> Tuple:
+        if not self.keyset_pagination:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get("cursor", None))
+        return paginator, page, page.object_list, page.has_other_pages()
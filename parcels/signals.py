@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import connections
+
+from .models import Advert, PlaceStatistics
+
+UNACCENT_CONFIG = "polish_unaccent"
+
+
+def create_search_config(using: str = "default", **kwargs) -> None:
+    """
+    Creates the text search configuration for polish descriptions.
+    It strips diacritics with unaccent, so 'dzialka' matches 'działka',
+    and lowercases words with the simple dictionary as PostgreSQL
+    has no polish stemmer built in.
+    """
+
+    with connections[using].cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        cursor.execute(
+            f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_ts_config WHERE cfgname = '{UNACCENT_CONFIG}'
+                ) THEN
+                    CREATE TEXT SEARCH CONFIGURATION {UNACCENT_CONFIG} (COPY = simple);
+                    ALTER TEXT SEARCH CONFIGURATION {UNACCENT_CONFIG}
+                        ALTER MAPPING FOR hword, hword_part, word
+                        WITH unaccent, simple;
+                END IF;
+            END
+            $$;
+            """
+        )
+
+
+def update_search_vectors(using: str = "default", **kwargs) -> None:
+    """
+    Computes search vectors of adverts saved before the description search,
+    which are otherwise filled only by the next ingestion. All vectors are
+    recomputed when SEARCH_CONFIG differs from the configuration they were
+    built with, which is kept in the comment of the column.
+    """
+
+    advert_table = Advert._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT col_description(attrelid, attnum) FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attname = 'search_vector'
+            """,
+            [advert_table],
+        )
+        row = cursor.fetchone()
+        refresh = row is None or row[0] != settings.SEARCH_CONFIG
+        Advert.update_search_vectors(refresh=refresh, using=using)
+        if refresh:
+            cursor.execute(
+                f"COMMENT ON COLUMN {advert_table}.search_vector IS %s",
+                [settings.SEARCH_CONFIG],
+            )
+
+
+def create_statistics_view(using: str = "default", **kwargs) -> None:
+    """ Creates the materialized view with adverts statistics for PlaceStatistics. """
+
+    statistics_table = PlaceStatistics._meta.db_table
+    advert_table = Advert._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS {statistics_table} AS
+            SELECT
+                row_number() OVER (ORDER BY place, county) AS id,
+                place,
+                county,
+                count(*) AS count,
+                min(price) AS min_price,
+                percentile_cont(0.5) WITHIN GROUP (ORDER BY price) AS median_price,
+                avg(price) AS avg_price,
+                min(price_per_m2) AS min_price_per_m2,
+                percentile_cont(0.5) WITHIN GROUP (
+                    ORDER BY price_per_m2
+                ) AS median_price_per_m2,
+                avg(price_per_m2) AS avg_price_per_m2,
+                min(area) AS min_area,
+                max(area) AS max_area
+            FROM {advert_table}
+            GROUP BY place, county
+            """
+        )
+        cursor.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {statistics_table}_id "
+            f"ON {statistics_table} (id)"
+        )
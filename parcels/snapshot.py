@@ -0,0 +1,160 @@
+import threading
+from typing import *
+
+import numpy as np
+
+from .caching import get_generation
+from .models import Advert
+
+
+class SnapshotResult:
+    """
+    Ids of adverts matching the filters in display order. Behaves like
+    a list of adverts for the paginator, fetching from the database only
+    the adverts of the requested page.
+    """
+
+    model = Advert
+    ordered = True
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        place_codes: np.ndarray,
+        prices: np.ndarray,
+        areas: np.ndarray,
+        place_names: np.ndarray,
+    ):
+        self.ids = ids
+        self.place_codes = place_codes
+        self.prices = prices
+        self.areas = areas
+        self.place_names = place_names
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Advert]:
+        return iter(self[:])
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Advert, List[Advert]]:
+        if isinstance(index, slice):
+            ids = self.ids[index].tolist()
+            adverts = Advert.objects.in_bulk(ids)
+            return [adverts[_id] for _id in ids if _id in adverts]
+        return Advert.objects.get(pk=int(self.ids[index]))
+
+    def facets(self) -> Dict:
+        """ Answers Advert.get_facets from the snapshot columns. """
+
+        counts = np.bincount(self.place_codes, minlength=len(self.place_names))
+        places = [
+            (place, int(count))
+            for place, count in zip(self.place_names.tolist(), counts.tolist())
+            if count and place != ""
+        ]
+        return {
+            "places": sorted(places, key=lambda item: (-item[1], item[0])),
+            "prices": [
+                (limit, int(np.count_nonzero(self.prices <= limit)))
+                for limit in Advert.PRICE_FACETS
+            ],
+            "areas": [
+                (limit, int(np.count_nonzero(self.areas >= limit)))
+                for limit in Advert.AREA_FACETS
+            ],
+        }
+
+
+class AdvertSnapshot:
+    """
+    In-memory, columnar copy of the adverts filter columns sorted by price.
+    It is loaded on first use and reloaded when the data generation changes,
+    so every process picks up new adverts after the ingestion.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.price = np.empty(0, dtype=np.float64)
+        self.area = np.empty(0, dtype=np.float64)
+        self.price_per_m2 = np.empty(0, dtype=np.float64)
+        self.place_codes = np.empty(0, dtype=np.int32)
+        self.places = {}
+        self.place_names = np.empty(0, dtype=str)
+
+    def load(self) -> None:
+        generation = get_generation()
+        rows = list(
+            Advert.objects.values_list("id", "price", "area", "price_per_m2", "place")
+        )
+        if rows:
+            ids, price, area, price_per_m2, places = zip(*rows)
+        else:
+            ids = price = area = price_per_m2 = places = ()
+        price = np.array(price, dtype=np.float64)
+        # nulls are last as in the database ordering
+        order = np.lexsort((np.array(ids), np.where(np.isnan(price), np.inf, price)))
+        unique_places, place_codes = np.unique(
+            np.array(["" if place is None else place for place in places]),
+            return_inverse=True,
+        )
+
+        with self.lock:
+            self.ids = np.array(ids, dtype=np.int64)[order]
+            self.price = price[order]
+            self.area = np.array(area, dtype=np.float64)[order]
+            self.price_per_m2 = np.array(price_per_m2, dtype=np.float64)[order]
+            self.place_codes = place_codes.astype(np.int32)[order]
+            self.places = {place: code for code, place in enumerate(unique_places)}
+            self.place_names = unique_places
+            self.generation = generation
+
+    def ensure_loaded(self) -> None:
+        if self.generation != get_generation():
+            self.load()
+
+    def filter(
+        self,
+        place: str,
+        price: Union[str, int],
+        area: Union[str, int],
+        search_text: str = None,
+        radius: Union[str, int] = 0,
+    ) -> Union[SnapshotResult, None]:
+        """
+        Answers Advert.filter_adverts with vectorized masks.
+        Returns None for description and radius searches which need the database.
+        """
+
+        if (search_text and search_text != "None") or Advert.convert_input(
+            radius, int
+        ):
+            return None
+        price = Advert.convert_input(price, int)
+        area = Advert.convert_input(area, int)
+
+        self.ensure_loaded()
+        with self.lock:
+            ids, prices, areas = self.ids, self.price, self.area
+            place_codes, places = self.place_codes, self.places
+            place_names = self.place_names
+
+        mask = np.ones(len(ids), dtype=bool)
+        if place and place != "None":
+            code = places.get(place)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= place_codes == code
+        if price:
+            mask &= prices <= price
+        if area:
+            mask &= areas >= area
+        return SnapshotResult(
+            ids[mask], place_codes[mask], prices[mask], areas[mask], place_names
+        )
+
+
+snapshot = AdvertSnapshot()
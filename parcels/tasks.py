@@ -1,11 +1,16 @@
-import glob
+import gzip
 import logging
 import os
+import smtplib
+import socket
+import tempfile
 from typing import *
 
 from celery import shared_task
-from django.core.mail import EmailMessage
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
 from django.db.utils import ProgrammingError
+from django.template.loader import render_to_string
 from scrapy.crawler import CrawlerProcess
 from scrapy.utils.project import get_project_settings
 
@@ -14,43 +19,207 @@ from adverts_crawler.adverts_crawler.spiders.scraper import (
     AdresowoSpider,
     StrzelczykSpider,
 )
-from parcels.models import Advert
-from parcels_web_app.settings import SCRAPED_DATA_CATALOG
+from parcels.caching import bump_generation
+from parcels.exporters import get_exporter
+from parcels.helpers import filter_adverts
+from parcels.models import Advert, PlaceStatistics, SavedSearch
+from parcels_web_app.settings import (
+    SCRAPED_DATA_CATALOG,
+    ADVERTS_BATCH_SIZE,
+    EMAIL_BATCH_SIZE,
+    EMAIL_MAX_RETRIES,
+    EMAIL_RETRY_BACKOFF,
+)
 
 logging.basicConfig(level=logging.DEBUG)
 
+TRANSIENT_EMAIL_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    ConnectionError,
+    socket.timeout,
+)
+
+
+def deliver_emails(emails: List[EmailMessage]) -> Tuple[int, List[EmailMessage]]:
+    """
+    Sends messages over one SMTP connection instead of opening
+    a new one for every message. Messages refused by the server,
+    e.g. because of a wrong address, are logged and skipped.
+
+    :param emails: Messages to send.
+    :return: Amount of sent messages and messages not sent because of
+        a transient error.
+    """
+
+    connection = get_connection()
+    sent = index = 0
+    try:
+        connection.open()
+        for index, email in enumerate(emails):
+            try:
+                sent += connection.send_messages([email])
+            except TRANSIENT_EMAIL_ERRORS:
+                raise
+            except smtplib.SMTPException as e:
+                logging.error(f"Email to {email.to} was refused: {e}")
+    except TRANSIENT_EMAIL_ERRORS as e:
+        logging.warning(f"Sending emails failed: {e}")
+        return sent, emails[index:]
+    finally:
+        connection.close()
+    return sent, []
+
+
+def get_retry_countdown(retries: int) -> int:
+    return EMAIL_RETRY_BACKOFF * 2 ** retries
+
+
+@shared_task
+def send_emails(messages: List[Dict], retries: int = 0) -> int:
+    """
+    Sends a batch of messages over one SMTP connection. Messages not sent
+    because of a transient error are sent again by a new task after
+    an exponential backoff, until EMAIL_MAX_RETRIES attempts.
+
+    :param messages: Keyword arguments of EmailMessage.
+    :param retries: Amount of failed attempts to send the messages.
+    :return: Amount of sent messages.
+    """
+
+    sent, failed = deliver_emails([EmailMessage(**message) for message in messages])
+    if failed:
+        # messages after the first transient failure are not sent
+        failed = messages[len(messages) - len(failed) :]
+        if retries < EMAIL_MAX_RETRIES:
+            send_emails.apply_async(
+                (failed, retries + 1), countdown=get_retry_countdown(retries)
+            )
+        else:
+            logging.error(f"Dropped {len(failed)} emails after {retries} retries.")
+    return sent
+
 
 @shared_task
 def send_email(subject: str, body: str, to: List, attachments: List = None) -> None:
-    email = EmailMessage(subject=subject, body=body, to=to, attachments=attachments)
-    email.send()
+    send_emails(
+        [{"subject": subject, "body": body, "to": to, "attachments": attachments}]
+    )
 
 
 @shared_task
-def run_spider() -> None:
-    # remove files
-    [os.remove(file) for file in glob.glob(f"{SCRAPED_DATA_CATALOG}/*.csv")]
+def send_adverts_csv(
+    user_id: int,
+    view_name: str,
+    params: Dict,
+    compress: bool = False,
+    export_format: str = "csv",
+    retries: int = 0,
+) -> None:
+    """
+    Sends the user an email with file of adverts selected in the view.
+    The file is attached from a temporary file, so it is never kept in
+    memory or passed to the broker. On a transient error the task is run
+    again after an exponential backoff, until EMAIL_MAX_RETRIES attempts.
+    """
+
+    user = User.objects.get(pk=user_id)
+    adverts = filter_adverts(user_id=user_id, view_name=view_name, params=params)
+    exporter = get_exporter(export_format)
+    filename = exporter.filename
+    mimetype = exporter.content_type
+    if compress:
+        filename, mimetype = f"{filename}.gz", "application/gzip"
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, filename)
+        opener = gzip.open if compress else open
+        with opener(path, "wb") as file:
+            exporter.write(adverts, file)
+        email = EmailMessage(
+            subject="ParcelsScraper - wybrane działki",
+            body="W załączeniu przesyłamy wybrane przez Ciebie działki.",
+            to=[user.email],
+        )
+        email.attach_file(path, mimetype)
+        _, failed = deliver_emails([email])
+    if not failed:
+        return
+    if retries < EMAIL_MAX_RETRIES:
+        send_adverts_csv.apply_async(
+            (user_id, view_name, params, compress, export_format, retries + 1),
+            countdown=get_retry_countdown(retries),
+        )
+    else:
+        logging.error(f"Dropped adverts email to {user.email} after {retries} retries.")
 
-    # crawl data
+
+@shared_task
+def run_spider() -> None:
+    # crawl data and save it to db with the item pipeline, which is
+    # configured only here as it needs django set up
     s = get_project_settings()
-    s["FEED_FORMAT"] = "csv"
-    s["FEED_URI"] = f"{SCRAPED_DATA_CATALOG}/adverts.csv"
+    s["ITEM_PIPELINES"] = {
+        "adverts_crawler.adverts_crawler.pipelines.AdvertsNormalizationPipeline": 200,
+        "adverts_crawler.adverts_crawler.pipelines.AdvertsCrawlerPipeline": 300,
+    }
+    s["ADVERTS_BATCH_SIZE"] = ADVERTS_BATCH_SIZE
+    Advert.backfill_identities()
+    last_id = Advert.get_last_id()
     process = CrawlerProcess(s)
     process.crawl(MorizonSpider)
     process.crawl(AdresowoSpider)
     process.crawl(StrzelczykSpider)
     process.start()
+    Advert.refresh_places()
+    PlaceStatistics.refresh()
+    bump_generation()
+    send_saved_search_alerts.delay(last_id)
     logging.info("Data scraped successfully")
 
-    # Upload data to db
-    upload_data()
-
 
 @shared_task
 def upload_data() -> None:
+    Advert.backfill_identities()
+    last_id = Advert.get_last_id()
     try:
         Advert.load_adverts(SCRAPED_DATA_CATALOG)
     except (ProgrammingError, FileNotFoundError) as e:
         logging.error(f"ERROR: {e.__str__()}")
-    Advert.delete_duplicates()
+        return
+    Advert.refresh_places()
+    PlaceStatistics.refresh()
+    bump_generation()
+    send_saved_search_alerts.delay(last_id)
     logging.info("Data successfully updated.")
+
+
+@shared_task
+def send_saved_search_alerts(after_id: int) -> int:
+    """
+    Emails every user one digest of adverts inserted after the given id
+    which match the user's saved searches.
+
+    :return: Amount of digests.
+    """
+
+    digests = {}
+    for search, adverts in SavedSearch.match_adverts(after_id).items():
+        digests.setdefault(search.user, []).append((search, adverts))
+    messages = []
+    for user, matches in digests.items():
+        if not user.is_active or not user.email:
+            continue
+        body = render_to_string(
+            "parcels/saved_search_mail.txt", {"user": user, "matches": matches}
+        )
+        messages.append(
+            {
+                "subject": "ParcelsScraper - nowe działki",
+                "body": body,
+                "to": [user.email],
+            }
+        )
+    for start in range(0, len(messages), EMAIL_BATCH_SIZE):
+        send_emails.delay(messages[start : start + EMAIL_BATCH_SIZE])
+    logging.info(f"Queued {len(messages)} saved search digests.")
+    return len(messages)
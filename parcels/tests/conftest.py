@@ -3,6 +3,7 @@ import os
 import pandas as pd
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import Client, RequestFactory
 
 from parcels.models import Advert, Favourite
@@ -40,12 +41,20 @@ def create_test_csv():
 
 
 @pytest.fixture(autouse=True)
-def populate_db_with_test_data():
+def local_cache(settings):
+    """ Keeps tests away from redis, which is shared with the celery broker. """
+
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+
+@pytest.fixture(autouse=True)
+def populate_db_with_test_data(local_cache):
     """Adds data to database."""
 
-    for item in testing_data:
-        Advert(**item).save()
-    Advert.delete_duplicates()
+    cache.clear()
+    Advert.save_items(testing_data)
 
 
 @pytest.fixture
@@ -0,0 +1,25 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_explain_adverts():
+    out = StringIO()
+    call_command("explain_adverts", stdout=out)
+    assert "place, price and area" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_merge_favourites():
+    out = StringIO()
+    call_command("merge_favourites", stdout=out)
+    assert "Merged 0 duplicates." in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_backfill_identities():
+    out = StringIO()
+    call_command("backfill_identities", stdout=out)
+    assert "Set identity of 0 adverts." in out.getvalue()
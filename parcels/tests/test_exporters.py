@@ -0,0 +1,45 @@
+import json
+from io import BytesIO
+
+import pyarrow.parquet as pq
+import pytest
+from openpyxl import load_workbook
+
+from parcels.exporters import get_exporter
+from parcels.models import Advert
+
+
+@pytest.mark.django_db
+class TestExporters:
+    """ Class for testing adverts exporters. """
+
+    pytestmark = pytest.mark.django_db
+
+    @staticmethod
+    def export(export_format: str) -> bytes:
+        file = BytesIO()
+        get_exporter(export_format, chunk_size=2).write(Advert.objects.all(), file)
+        return file.getvalue()
+
+    def test_csv(self):
+        rows = self.export("csv").decode().splitlines()
+        assert rows[0].startswith("Miejscowość,Powiat")
+        assert len(rows) == 4
+
+    def test_json_lines(self):
+        rows = [json.loads(row) for row in self.export("jsonl").splitlines()]
+        assert len(rows) == 3
+        assert isinstance(rows[0]["price"], float)
+
+    def test_parquet(self):
+        table = pq.read_table(BytesIO(self.export("parquet")))
+        assert table.num_rows == 3
+        assert str(table.schema.field("area").type) == "double"
+
+    def test_xlsx(self):
+        workbook = load_workbook(BytesIO(self.export("xlsx")))
+        assert workbook.active.max_row == 4
+
+    def test_unknown_format(self):
+        with pytest.raises(KeyError):
+            get_exporter("xml")
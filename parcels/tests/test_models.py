@@ -2,11 +2,15 @@ import os
 from collections.abc import Iterable
 
 import pytest
+from django.contrib.postgres.search import SearchVector
+from django.db import IntegrityError, transaction
 
-from parcels.models import Advert, Favourite
+from parcels import signals
+from parcels.models import Advert, Favourite, SavedSearch
 from parcels.tests.conftest import (
     TEST_DIR,
 )
+from parcels.tests.test_data import testing_data
 
 
 @pytest.mark.django_db
@@ -19,6 +23,26 @@ class TestAdvert:
         Advert.load_adverts(TEST_DIR)
         assert Advert.objects.exists()
 
+    def test_load_adverts_in_batches(self, create_test_csv):
+        Advert.objects.all().delete()
+        Advert.load_adverts(TEST_DIR, batch_size=2)
+        assert Advert.objects.count() == 3
+
+    def test_load_adverts_skips_existing_adverts(self, create_test_csv):
+        Advert.objects.all().delete()
+        Advert.load_adverts(TEST_DIR)
+        Advert.load_adverts(TEST_DIR)
+        assert Advert.objects.count() == 3
+
+    def test_save_items(self):
+        Advert.objects.all().delete()
+        assert Advert.save_items(testing_data) == 5
+        assert Advert.objects.count() == 3
+
+    def test_parse_row_when_invalid_price(self):
+        item = ["Rysie", "miński", "brak", 80, 2190, "", "", "", ""]
+        assert Advert.parse_row(item) is None
+
     def test_load_adverts_when_no_files(self):
         try:
             os.remove(os.path.join(os.getcwd(), TEST_DIR, "test_data.csv"))
@@ -33,6 +57,33 @@ class TestAdvert:
         expected_data = ["Dębe Wielkie", "Rysie", "Rysie"]
         assert actual_data == expected_data
 
+    def test_delete_duplicates_returns_amount_of_deleted(self, test_adverts):
+        # adverts saved before identity was introduced can be duplicated
+        advert = test_adverts.get(place="Dębe Wielkie")
+        advert.pk = advert.identity = None
+        Advert.objects.bulk_create([advert])
+        assert Advert.delete_duplicates() == 1
+        assert Advert.delete_duplicates() == 0
+
+    def test_save_sets_identity(self, test_adverts):
+        advert = test_adverts.get(place="Dębe Wielkie")
+        identity = advert.identity
+        advert.pk = advert.identity = None
+        advert.price = "376000"
+        with pytest.raises(IntegrityError), transaction.atomic():
+            advert.save()
+        assert advert.identity == identity
+
+    def test_backfill_identities(self, test_adverts):
+        identities = dict(Advert.objects.values_list("id", "identity"))
+        advert = test_adverts.get(place="Dębe Wielkie")
+        advert.pk = advert.identity = None
+        Advert.objects.bulk_create([advert])
+        Advert.objects.update(identity=None)
+        assert Advert.backfill_identities() == 3
+        assert dict(Advert.objects.values_list("id", "identity")) == identities
+        assert Advert.backfill_identities() == 0
+
     def test_get_adverts_when_advert_do_not_exist(self):
         assert not Advert.get_advert(500)
 
@@ -51,12 +102,85 @@ class TestAdvert:
             == "Rysie"
         )
 
+    def test_filter_adverts_by_radius(self):
+        # Rysie is about 4 km from Dębe Wielkie and 8 km from Mińsk Mazowiecki
+        adverts = Advert.filter_adverts(
+            place="Dębe Wielkie", price=0, area=0, radius=5
+        )
+        assert {advert.place for advert in adverts} == {"Dębe Wielkie", "Rysie"}
+        adverts = Advert.filter_adverts(
+            place="Mińsk Mazowiecki", price=0, area=0, radius=5
+        )
+        assert not adverts.exists()
+
+    def test_get_facets(self):
+        facets = Advert.get_facets(Advert.filter_adverts("None", 0, 0))
+        assert facets["places"] == [("Rysie", 2), ("Dębe Wielkie", 1)]
+        assert dict(facets["prices"]) == {
+            50000: 0,
+            100000: 0,
+            200000: 2,
+            300000: 2,
+            500000: 3,
+        }
+        assert dict(facets["areas"]) == {500: 3, 1000: 3, 1500: 2, 3000: 0, 5000: 0}
+
+    def test_get_facets_of_searched_adverts(self):
+        adverts = Advert.filter_adverts("None", 200000, 0, search_text="media")
+        facets = Advert.get_facets(adverts)
+        assert sum(count for place, count in facets["places"]) == adverts.count()
+
+    def test_geocode(self):
+        Advert.objects.update(latitude=None, longitude=None)
+        assert Advert.geocode() == 3
+        assert not Advert.objects.filter(latitude__isnull=True).exists()
+
     def test_search_text(self):
         adverts = Advert.objects.all()
         assert Advert.search_by_description(adverts, "media przy działce")
 
+    def test_search_text_without_polish_characters(self):
+        adverts = Advert.objects.all()
+        assert Advert.search_by_description(adverts, "dzialka")
+
+    def test_load_adverts_fills_search_vector(self, create_test_csv):
+        Advert.objects.all().delete()
+        Advert.load_adverts(TEST_DIR)
+        assert not Advert.objects.filter(search_vector__isnull=True).exists()
+
+    def test_update_search_vectors_of_given_identities(self, test_adverts):
+        Advert.objects.update(search_vector=None)
+        identity = test_adverts[0].identity
+        assert Advert.update_search_vectors(identities=[identity]) == 1
+        assert list(
+            Advert.objects.filter(search_vector__isnull=False).values_list(
+                "identity", flat=True
+            )
+        ) == [identity]
+
+    def test_migrate_fills_search_vector(self):
+        Advert.objects.update(search_vector=None)
+        signals.update_search_vectors()
+        assert not Advert.objects.filter(search_vector__isnull=True).exists()
+
+    def test_migrate_refreshes_search_vector_after_config_change(self, settings):
+        signals.update_search_vectors()
+        Advert.objects.update(search_vector=SearchVector("description"))
+        signals.update_search_vectors()
+        assert not Advert.search_by_description(Advert.objects.all(), "dzialka")
+        settings.SEARCH_CONFIG = "simple"
+        signals.update_search_vectors()
+        settings.SEARCH_CONFIG = signals.UNACCENT_CONFIG
+        signals.update_search_vectors()
+        assert Advert.search_by_description(Advert.objects.all(), "dzialka")
+
     def test_get_places(self):
-        assert len(Advert.get_places()) == 2
+        assert Advert.get_places() == ("Dębe Wielkie", "Rysie")
+
+    def test_get_places_adds_places_of_new_adverts(self):
+        Advert.get_places()
+        Advert.save_items([dict(place="Kałuszyn", price=100000, area=1000)])
+        assert Advert.get_places() == ("Dębe Wielkie", "Kałuszyn", "Rysie")
 
 
 @pytest.mark.django_db
@@ -73,6 +197,11 @@ class TestFavourite:
         expected_adverts = test_adverts.values_list("place", "price", "area")
         assert list(added_adverts) == list(expected_adverts)
 
+    def test_add_to_favourite_skips_already_saved(self, user, test_adverts):
+        Favourite.add_to_favourite(user_id=user.id, adverts=test_adverts)
+        Favourite.add_to_favourite(user_id=user.id, adverts=test_adverts)
+        assert len(Favourite.get_favourites(user.id)) == 3
+
     def test_add_to_favourite_with_empty_list(self, user):
         Favourite.add_to_favourite(user_id=user.id, adverts=[])
         added_adverts = Favourite.objects.select_related("adverts").values_list(
@@ -120,7 +249,59 @@ class TestFavourite:
             assert result == expected
         assert len(result_adverts) == 3
 
+    def test_get_or_create_returns_the_same_instance(self, user):
+        fav = Favourite.get_or_create(user)
+        assert Favourite.get_or_create(user).id == fav.id
+        assert Favourite.objects.count() == 1
+
+    def test_get_saved_ids(self, user, test_adverts, add_favourites):
+        advert = test_adverts.get(place="Dębe Wielkie")
+        assert Favourite.get_saved_ids(user.id) == set(
+            test_adverts.values_list("id", flat=True)
+        )
+        Favourite.remove_from_favourite(user_id=user.id, adverts=[advert])
+        assert advert.id not in Favourite.get_saved_ids(user.id)
+
     def test_get_favourites_when_user_do_not_exist(self):
         result_advert = Favourite.get_favourites(user_id=100)
         assert list(result_advert) == []
         assert isinstance(result_advert, Iterable)
+        assert result_advert.model is Advert
+
+
+@pytest.mark.django_db
+class TestSavedSearch:
+    """ Class for testing saved searches. """
+
+    pytestmark = pytest.mark.django_db
+
+    def test_save_search_skips_already_saved(self, user):
+        params = {"place": "Rysie", "price": "200000", "area": "0"}
+        assert SavedSearch.save_search(user.id, params) == SavedSearch.save_search(
+            user.id, {**params, "search_text": "None"}
+        )
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"place": "Rysie"},
+            {"place": "None", "price": "200000", "area": "1000"},
+            {"place": "Dębe Wielkie", "search_text": "media"},
+        ],
+    )
+    def test_match_adverts(self, user, params):
+        search = SavedSearch.save_search(user.id, params)
+        expected = Advert.filter_adverts(
+            params["place"],
+            params.get("price", 0),
+            params.get("area", 0),
+            params.get("search_text"),
+        )
+        matches = SavedSearch.match_adverts(after_id=0)
+        assert {advert.id for advert in matches[search]} == set(
+            expected.values_list("id", flat=True)
+        )
+
+    def test_match_adverts_skips_old_adverts(self, user):
+        SavedSearch.save_search(user.id, {"place": "Rysie"})
+        assert SavedSearch.match_adverts(after_id=Advert.get_last_id()) == {}
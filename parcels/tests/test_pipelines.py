@@ -0,0 +1,79 @@
+import logging
+from datetime import date
+
+import pytest
+from scrapy.exceptions import DropItem
+from scrapy.statscollectors import MemoryStatsCollector
+
+from adverts_crawler.adverts_crawler.items import AdvertsCrawlerItem
+from adverts_crawler.adverts_crawler.pipelines import (
+    AdvertsCrawlerPipeline,
+    AdvertsNormalizationPipeline,
+    parse_date,
+    parse_number,
+)
+from parcels.models import Advert
+from parcels.tests.test_data import testing_data
+
+
+class FakeSpider:
+    name = "fake"
+    logger = logging.getLogger("fake")
+
+
+@pytest.fixture
+def pipeline(mocker):
+    return AdvertsNormalizationPipeline(stats=MemoryStatsCollector(mocker.Mock()))
+
+
+@pytest.mark.django_db
+def test_parse_number():
+    assert parse_number("376 000 zł") == 376000.0
+    assert parse_number("169,98 zł/m²") == 169.98
+    assert parse_number("2 212 m²") == 2212.0
+    assert parse_number("brak danych") is None
+
+
+@pytest.mark.django_db
+def test_parse_date():
+    assert parse_date("14/11/2019") == date(2019, 11, 14)
+    assert parse_date("2019-11-14") == date(2019, 11, 14)
+    assert parse_date("brak danych") is None
+
+
+@pytest.mark.django_db
+def test_normalization_computes_price_per_m2(pipeline):
+    item = AdvertsCrawlerItem(
+        place=" Rysie ", price="175 000 zł", area="2 000 m²", price_per_m2=None
+    )
+    item = pipeline.process_item(item, FakeSpider())
+    assert item["place"] == "Rysie"
+    assert item["price_per_m2"] == 87.5
+
+
+@pytest.mark.django_db
+def test_normalization_drops_item_without_price(pipeline):
+    item = AdvertsCrawlerItem(place="Rysie", price="Zapytaj o cenę", area="2000")
+    with pytest.raises(DropItem):
+        pipeline.process_item(item, FakeSpider())
+    assert pipeline.stats.get_value("normalization/rejected/fake") == 1
+
+
+@pytest.mark.django_db
+def test_crawler_pipeline_saves_adverts_in_batches():
+    Advert.objects.all().delete()
+    pipeline = AdvertsCrawlerPipeline(batch_size=2)
+    spider = FakeSpider()
+    # distinct prices, so the duplicated test adverts are not skipped
+    items = [
+        dict(item, price=str(int(item["price"]) + number))
+        for number, item in enumerate(testing_data[:3])
+    ]
+    for item in items:
+        pipeline.process_item(item, spider)
+    assert Advert.objects.count() == 2
+    assert len(pipeline.items) == 1
+
+    pipeline.close_spider(spider)
+    assert Advert.objects.count() == 3
+    assert pipeline.items == []
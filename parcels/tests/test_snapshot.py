@@ -0,0 +1,51 @@
+import pytest
+
+from parcels.caching import bump_generation
+from parcels.models import Advert
+from parcels.snapshot import AdvertSnapshot
+
+
+@pytest.mark.django_db
+class TestAdvertSnapshot:
+    """ Class for testing in-memory adverts filtering. """
+
+    pytestmark = pytest.mark.django_db
+
+    @pytest.mark.parametrize(
+        "place, price, area",
+        [
+            ("None", 0, 0),
+            ("Rysie", 0, 0),
+            ("None", 200000, 1000),
+            ("Dębe Wielkie", 400000, 800),
+            ("Kałuszyn", 0, 0),
+        ],
+    )
+    def test_filter_matches_database(self, place, price, area):
+        result = AdvertSnapshot().filter(place, price, area)
+        expected = Advert.filter_adverts(place, price, area)
+        assert list(result.ids) == list(expected.values_list("id", flat=True))
+
+    @pytest.mark.parametrize(
+        "place, price, area",
+        [("None", 0, 0), ("Rysie", 200000, 0), ("Kałuszyn", 0, 0)],
+    )
+    def test_facets_match_database(self, place, price, area):
+        result = AdvertSnapshot().filter(place, price, area)
+        expected = Advert.filter_adverts(place, price, area)
+        assert result.facets() == Advert.get_facets(expected)
+
+    def test_filter_returns_page_of_adverts(self):
+        result = AdvertSnapshot().filter("None", 0, 0)
+        assert [advert.price for advert in result[1:3]] == [175000, 376000]
+
+    def test_filter_skips_description_search(self):
+        assert AdvertSnapshot().filter("None", 0, 0, search_text="media") is None
+
+    def test_reloads_after_ingestion(self):
+        snapshot = AdvertSnapshot()
+        assert len(snapshot.filter("None", 0, 0)) == 3
+        Advert.objects.filter(place="Rysie").delete()
+        assert len(snapshot.filter("None", 0, 0)) == 3
+        bump_generation()
+        assert len(snapshot.filter("None", 0, 0)) == 1
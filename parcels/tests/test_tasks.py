@@ -1,31 +1,169 @@
-import glob
+import gzip
+import smtplib
+from unittest import mock
 
 import pytest
+from django.contrib.auth.models import User
 from scrapy.crawler import CrawlerProcess
 
 from parcels import tasks
-from parcels.models import Advert
-from parcels_web_app.settings import SCRAPED_DATA_CATALOG
+from parcels.models import Advert, SavedSearch
+from parcels_web_app.settings import (
+    EMAIL_BATCH_SIZE,
+    EMAIL_MAX_RETRIES,
+    EMAIL_RETRY_BACKOFF,
+    SCRAPED_DATA_CATALOG,
+)
 
 
 @pytest.mark.django_db
 def test_run_spider(mocker):
-    mocker.patch("glob.glob")
     mocker.patch.object(CrawlerProcess, "crawl", return_value=True)
     mocker.patch.object(CrawlerProcess, "start", return_value=True)
     mocker.patch("parcels.tasks.upload_data")
+    mocker.patch("parcels.tasks.send_saved_search_alerts.delay")
     process = CrawlerProcess()
     tasks.run_spider()
-    glob.glob.assert_called_with(f"{SCRAPED_DATA_CATALOG}/*.csv")
     process.crawl.assert_called()
     process.start.assert_called_once()
-    tasks.upload_data.assert_called_once()
+    tasks.upload_data.assert_not_called()
 
 
 @pytest.mark.django_db
 def test_upload_data(mocker):
     mocker.patch("parcels.models.Advert.load_adverts")
-    mocker.patch("parcels.models.Advert.delete_duplicates")
+    mocker.patch("parcels.tasks.send_saved_search_alerts.delay")
     tasks.upload_data()
     Advert.load_adverts.assert_called_with(SCRAPED_DATA_CATALOG)
-    Advert.delete_duplicates.assert_called_once()
+    tasks.send_saved_search_alerts.delay.assert_called_once_with(
+        Advert.get_last_id()
+    )
+
+
+@pytest.mark.django_db
+def test_upload_data_failure_keeps_generation(mocker):
+    mocker.patch(
+        "parcels.models.Advert.load_adverts", side_effect=FileNotFoundError("foo")
+    )
+    mocker.patch("parcels.tasks.bump_generation")
+    mocker.patch("parcels.tasks.send_saved_search_alerts.delay")
+    tasks.upload_data()
+    tasks.bump_generation.assert_not_called()
+    tasks.send_saved_search_alerts.delay.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_send_saved_search_alerts(user, mocker):
+    mocker.patch("parcels.tasks.send_emails.delay")
+    SavedSearch.save_search(user.id, {"place": "Rysie"})
+    SavedSearch.save_search(user.id, {"place": "None", "price": "400000"})
+    assert tasks.send_saved_search_alerts(after_id=Advert.get_last_id()) == 0
+    assert tasks.send_saved_search_alerts(after_id=0) == 1
+    [message] = tasks.send_emails.delay.call_args[0][0]
+    assert message["to"] == [user.email]
+    assert "Rysie:" in message["body"]
+    assert "do 400000 PLN:" in message["body"]
+
+
+MESSAGES = [
+    {"subject": "Temat", "body": f"Wiadomość {number}", "to": ["test@gmail.com"]}
+    for number in range(3)
+]
+SEND_MESSAGES = "django.core.mail.backends.locmem.EmailBackend.send_messages"
+
+
+@pytest.fixture
+def retry_later(mocker):
+    """ Keeps emails rescheduled after a failure from being sent. """
+
+    return mocker.patch("parcels.tasks.send_emails.apply_async")
+
+
+@pytest.mark.django_db
+def test_send_emails_reuses_connection(mailoutbox, mocker, retry_later):
+    mocker.patch("parcels.tasks.get_connection", wraps=tasks.get_connection)
+    assert tasks.send_emails(MESSAGES) == 3
+    tasks.get_connection.assert_called_once()
+    retry_later.assert_not_called()
+    assert [email.body for email in mailoutbox] == [
+        "Wiadomość 0",
+        "Wiadomość 1",
+        "Wiadomość 2",
+    ]
+
+
+@pytest.mark.django_db
+def test_send_emails_retries_transient_failures(mailoutbox, retry_later):
+    with mock.patch(
+        SEND_MESSAGES,
+        side_effect=[1, smtplib.SMTPServerDisconnected("Connection closed")],
+    ):
+        assert tasks.send_emails(MESSAGES) == 1
+    retry_later.assert_called_once_with(
+        (MESSAGES[1:], 1), countdown=EMAIL_RETRY_BACKOFF
+    )
+    (failed, retries), _ = retry_later.call_args
+    assert tasks.send_emails(failed, retries) == 2
+    assert [email.body for email in mailoutbox] == ["Wiadomość 1", "Wiadomość 2"]
+
+
+@pytest.mark.django_db
+def test_send_emails_drops_messages_after_max_retries(retry_later):
+    with mock.patch(SEND_MESSAGES, side_effect=ConnectionError("Refused")):
+        assert tasks.send_emails(MESSAGES, retries=EMAIL_MAX_RETRIES) == 0
+    retry_later.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_send_emails_skips_refused_messages(mocker, retry_later):
+    refused = smtplib.SMTPRecipientsRefused({"test@gmail.com": (550, b"No user")})
+    mocker.patch(SEND_MESSAGES, side_effect=[1, refused, 1])
+    assert tasks.send_emails(MESSAGES) == 2
+    retry_later.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_send_saved_search_alerts_in_batches(mocker):
+    mocker.patch("parcels.tasks.send_emails.delay")
+    users = [
+        User.objects.create(username=f"user_{number}", email=f"{number}@gmail.com")
+        for number in range(EMAIL_BATCH_SIZE + 1)
+    ]
+    for user in users:
+        SavedSearch.save_search(user.id, {"place": "Rysie"})
+    assert tasks.send_saved_search_alerts(after_id=0) == EMAIL_BATCH_SIZE + 1
+    assert [len(call[0][0]) for call in tasks.send_emails.delay.call_args_list] == [
+        EMAIL_BATCH_SIZE,
+        1,
+    ]
+
+
+@pytest.mark.django_db
+def test_send_email(mailoutbox):
+    tasks.send_email(subject="Temat", body="Wiadomość", to=["test@gmail.com"])
+    assert len(mailoutbox) == 1
+    assert mailoutbox[0].to == ["test@gmail.com"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("compress", [False, True])
+def test_send_adverts_csv(user, add_favourites, mailoutbox, compress):
+    tasks.send_adverts_csv(
+        user_id=user.id, view_name="favourites", params={}, compress=compress
+    )
+    assert len(mailoutbox) == 1
+    filename, content, mimetype = mailoutbox[0].attachments[0]
+    if compress:
+        content = gzip.decompress(content)
+        assert filename == "your_adverts.csv.gz"
+    assert len(content.splitlines()) == 4
+
+
+@pytest.mark.django_db
+def test_send_adverts_csv_retries_transient_failures(user, add_favourites, mocker):
+    mocker.patch("parcels.tasks.send_adverts_csv.apply_async")
+    mocker.patch(SEND_MESSAGES, side_effect=ConnectionError("Refused"))
+    tasks.send_adverts_csv(user_id=user.id, view_name="favourites", params={})
+    tasks.send_adverts_csv.apply_async.assert_called_once_with(
+        (user.id, "favourites", {}, False, "csv", 1), countdown=EMAIL_RETRY_BACKOFF
+    )
@@ -7,7 +7,9 @@ from django.utils.http import urlsafe_base64_encode
 
 from parcels import tasks
 from parcels import views
-from parcels.models import Advert, Favourite
+from parcels.caching import bump_generation, normalize_params
+from parcels.models import Advert, Favourite, PlaceStatistics, SavedSearch
+from parcels.pagination import KeysetPaginator
 from parcels.tokens import account_activation_token
 
 
@@ -53,20 +55,146 @@ class TestViews:
         for key in ["place", "price", "area"]:
             assert context.get(key) == str(kwargs.get(key))
 
-    def test_advert_list_view_post(self, client, mocker):
-        kwargs = {
-            "place": None,
-            "price": 0,
-            "area": 0,
-        }
-        response = client.post(
-            "{}?place={place}&price={price}&area={area}".format(
-                reverse("parcels:advert_list"),
-                **kwargs,
-            )
+    @pytest.mark.parametrize("logged_in", [False, True])
+    def test_advert_list_view_without_params(self, request, client, logged_in):
+        if logged_in:
+            request.getfixturevalue("user")
+            client.login(username="test_user", password="password")
+        response = client.get(reverse("parcels:advert_list"))
+        assert response.status_code == 200
+        assert b"Rysie (2)" in response.content
+
+    def test_advert_list_view_facets(self, user, client, mocker):
+        spy = mocker.spy(Advert, "get_facets")
+        url = reverse("parcels:advert_list")
+        response = client.get(url, {"place": "Rysie", "price": 0, "area": 0})
+        facets = response.context_data["facets"]
+        assert facets["places"] == [("Rysie", 2)]
+        assert dict(facets["prices"])[200000] == 2
+        assert b"Rysie (2)" in response.content
+        client.get(url, {"place": "Rysie", "price": "0", "page": 1})
+        assert spy.call_count == 1
+
+    def test_advert_list_view_is_cached_for_anonymous(self, client, mocker):
+        mocker.spy(Advert, "filter_adverts")
+        url = reverse("parcels:advert_list")
+        first = client.get(url, {"place": "None", "price": 400000})
+        second = client.get(url, {"place": "", "price": "400000"})
+        assert first.content == second.content
+        assert Advert.filter_adverts.call_count == 1
+
+        bump_generation()
+        client.get(url, {"place": "None", "price": 400000})
+        assert Advert.filter_adverts.call_count == 2
+
+    def test_advert_list_view_cached_page_has_no_csrf_token(self, client):
+        url = reverse("parcels:advert_list")
+        response = client.get(url, {"place": "Rysie", "price": 0, "area": 0})
+        assert b"csrfmiddlewaretoken" not in response.content
+        assert b'<form method="get"' in response.content
+
+    def test_advert_list_view_is_not_cached_for_user(self, user, client, mocker):
+        mocker.spy(Advert, "filter_adverts")
+        client.get(reverse("parcels:advert_list"))
+        client.get(reverse("parcels:advert_list"))
+        assert Advert.filter_adverts.call_count == 2
+
+    def test_advert_list_view_caches_advert_cards(self, user, client):
+        client.get(reverse("parcels:advert_list"))
+        advert = Advert.objects.get(place="Dębe Wielkie")
+        Advert.objects.filter(pk=advert.pk).update(place="Kałuszyn")
+        response = client.get(reverse("parcels:advert_list"))
+        assert "Kałuszyn" not in response.content.decode()
+
+        bump_generation()
+        response = client.get(reverse("parcels:advert_list"))
+        assert "Kałuszyn" in response.content.decode()
+
+    def test_advert_list_view_conditional_get(self, user, client):
+        url = reverse("parcels:advert_list")
+        client.get(url)
+        etag = client.get(url)["ETag"]
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        advert = Advert.objects.get(place="Dębe Wielkie")
+        Favourite.add_to_favourite(user_id=user.id, adverts=[advert])
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_conditional_get_does_not_depend_on_session(self, user, client):
+        etag = client.get(reverse("parcels:advert_list"))["ETag"]
+        response = client.get(
+            reverse("parcels:favourite_list"), HTTP_IF_NONE_MATCH=etag
         )
-        assert response.status_code == 302
-        assert "?place=None&price=0&area=0&search_text=None" in response.url
+        assert response.status_code == 304
+
+    def test_advert_list_view_with_keyset_pagination(self, client, mocker):
+        mocker.patch.object(views.AdvertListView, "keyset_pagination", True)
+        mocker.patch.object(views.AdvertListView, "paginate_by", 2)
+        url = reverse("parcels:advert_list")
+        first_page = client.get(url).context_data["page_obj"]
+        assert [advert.price for advert in first_page] == [150000, 175000]
+        assert not first_page.has_previous()
+
+        second_page = client.get(url, {"cursor": first_page.next_cursor})
+        second_page = second_page.context_data["page_obj"]
+        assert [advert.price for advert in second_page] == [376000]
+        assert second_page.number == 2
+        assert not second_page.has_next()
+
+        previous_page = client.get(url, {"cursor": second_page.previous_cursor})
+        previous_page = previous_page.context_data["page_obj"]
+        assert list(previous_page) == list(first_page)
+        assert not previous_page.has_previous()
+
+    def test_advert_list_view_pages_through_search(self, client, mocker):
+        mocker.patch.object(views.AdvertListView, "keyset_pagination", True)
+        mocker.patch.object(views.AdvertListView, "paginate_by", 1)
+        url = reverse("parcels:advert_list")
+        params = {"place": "None", "price": 0, "area": 0, "search_text": "działka"}
+        page = client.get(url, params).context_data["page_obj"]
+        ids = [advert.id for advert in page]
+        while page.has_next():
+            response = client.get(url, {**params, "cursor": page.next_cursor})
+            page = response.context_data["page_obj"]
+            ids += [advert.id for advert in page]
+        assert sorted(ids) == sorted(Advert.objects.values_list("id", flat=True))
+
+    @pytest.mark.parametrize(
+        "cursor",
+        [
+            "not a cursor",
+            KeysetPaginator.encode_cursor("abc", 1, 2, False),
+            KeysetPaginator.encode_cursor(150000, "1", 2, False),
+            KeysetPaginator.encode_cursor(150000, 1, 2, "false"),
+        ],
+    )
+    def test_advert_list_view_with_invalid_cursor(self, client, mocker, cursor):
+        mocker.patch.object(views.AdvertListView, "keyset_pagination", True)
+        response = client.get(reverse("parcels:advert_list"), {"cursor": cursor})
+        assert response.status_code == 404
+
+    def test_favourite_list_view_with_keyset_pagination_without_favourites(
+        self, user, client, mocker
+    ):
+        mocker.patch.object(views.FavouriteListView, "keyset_pagination", True)
+        response = client.get(reverse("parcels:favourite_list"))
+        assert response.status_code == 200
+        assert list(response.context_data["object_list"]) == []
+
+    def test_advert_list_view_search(self, client):
+        response = client.get(
+            reverse("parcels:advert_list"),
+            {"place": "None", "price": 0, "area": 0, "search_text": "wodociąg"},
+        )
+        assert response.status_code == 200
+        assert {advert.place for advert in response.context_data["object_list"]} == {
+            "Rysie"
+        }
+
+    def test_advert_detail_view_without_params(self, client):
+        pk = Advert.objects.first().id
+        response = client.get(reverse("parcels:advert_detail", kwargs={"pk": pk}))
+        assert response.status_code == 200
 
     def test_advert_detail_view(self, client):
         kwargs = {
@@ -91,10 +219,27 @@ class TestViews:
         query = context["object_list"]
         assert len(query.values_list("place")) == 3
 
-    def test_favourite_list_view_post(self, user, client):
-        response = client.post(reverse("parcels:favourite_list"))
-        assert response.status_code == 302
-        assert "?search_text=None" in response.url
+    def test_favourite_list_view_search(self, user, client, add_favourites):
+        response = client.get(
+            reverse("parcels:favourite_list"), {"search_text": "wodociąg"}
+        )
+        assert response.status_code == 200
+        assert {advert.place for advert in response.context_data["object_list"]} == {
+            "Rysie"
+        }
+
+    def test_statistics_json(self, client):
+        PlaceStatistics.refresh()
+        response = client.get(reverse("parcels:statistics_json"))
+        statistics = {row["place"]: row for row in response.json()["statistics"]}
+        assert statistics["Rysie"]["count"] == 2
+        assert statistics["Rysie"]["median_price"] == 162500
+        assert statistics["Dębe Wielkie"]["max_area"] == 2212
+
+    def test_statistics_view(self, client):
+        PlaceStatistics.refresh()
+        response = client.get(reverse("parcels:statistics"))
+        assert len(response.context_data["object_list"]) == 2
 
     def test_register_when_valid_form(self, client, mocker):
         mocker.patch("parcels.tasks.send_email.delay")
@@ -191,6 +336,25 @@ class TestViews:
             ("Rysie",),
         ]
 
+    def test_delete_advert_with_next(self, user, client, add_favourites):
+        pk = Advert.objects.get(place="Dębe Wielkie").id
+        next_url = reverse("parcels:favourite_list") + "?page=2"
+        response = client.get(
+            reverse("parcels:delete_advert", kwargs={"pk": pk}),
+            {"next": next_url},
+            HTTP_REFERER="http://foo/bar",
+        )
+        assert response.url == next_url
+
+    def test_delete_advert_with_foreign_next(self, user, client, add_favourites):
+        pk = Advert.objects.get(place="Dębe Wielkie").id
+        response = client.get(
+            reverse("parcels:delete_advert", kwargs={"pk": pk}),
+            {"next": "http://evil.com/"},
+            HTTP_REFERER="http://foo/bar",
+        )
+        assert response.url == "http://foo/bar"
+
     def test_save_all_adverts(self, user, client):
         response = client.post(
             reverse("parcels:save_all_adverts"), HTTP_REFERER="http://foo/bar"
@@ -198,6 +362,29 @@ class TestViews:
         assert response.status_code == 302
         assert len(Favourite.get_favourites(user.id).values_list("place")) == 3
 
+    def test_save_search(self, user, client):
+        response = client.get(
+            reverse("parcels:save_search"),
+            {"place": "Rysie", "price": 200000, "area": 0, "search_text": "None"},
+            HTTP_REFERER="http://foo/bar",
+        )
+        assert response.status_code == 302
+        search = SavedSearch.objects.get(user=user)
+        assert (search.place, search.price, search.search_text) == (
+            "Rysie",
+            200000,
+            None,
+        )
+
+    def test_save_search_with_radius(self, user, client):
+        response = client.get(
+            reverse("parcels:save_search"),
+            {"place": "Rysie", "price": 0, "area": 0, "radius": 5},
+            HTTP_REFERER="http://foo/bar",
+        )
+        assert response.status_code == 302
+        assert not SavedSearch.objects.filter(user=user).exists()
+
     def test_delete_all_adverts(self, user, client, add_favourites):
         response = client.post(
             reverse("parcels:delete_all_adverts"), HTTP_REFERER="http://foo/bar"
@@ -214,11 +401,55 @@ class TestViews:
             == '''attachment; filename="your_adverts.csv"'''
         )
 
+    def test_streaming_csv_content(self, user, add_favourites, client):
+        response = client.get(reverse("parcels:download_csv"), {"view": "favourites"})
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        assert rows[0].startswith("Miejscowość,Powiat")
+        assert len(rows) == 4
+
+    def test_streaming_csv_without_favourites(self, user, client):
+        response = client.get(reverse("parcels:download_csv"), {"view": "favourites"})
+        assert response.status_code == 200
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        assert len(rows) == 1
+
+    def test_streaming_csv_adverts_after_favourites(self, user, client):
+        client.get(reverse("parcels:favourite_list"))
+        response = client.get(reverse("parcels:download_csv"), {"view": "adverts"})
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        assert len(rows) == 4
+
+    def test_streaming_parquet(self, user, add_favourites, client):
+        response = client.get(reverse("parcels:download_csv"), {"format": "parquet"})
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/vnd.apache.parquet"
+        assert b"".join(response.streaming_content).startswith(b"PAR1")
+
+    def test_streaming_unknown_format(self, user, client):
+        response = client.get(reverse("parcels:download_csv"), {"format": "xml"})
+        assert response.status_code == 404
+
     def test_sending_csv(self, add_favourites, user, client, mocker):
-        mocker.patch("parcels.tasks.send_email.delay")
+        mocker.patch("parcels.tasks.send_adverts_csv.delay")
         response = client.post(
             reverse("parcels:send_csv"), HTTP_REFERER="http://foo/bar"
         )
 
         assert response.status_code == 302
-        tasks.send_email.delay.assert_called_once()
+        tasks.send_adverts_csv.delay.assert_called_once()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params, expected",
+    [
+        ({}, {"place": "", "price": 0, "area": 0, "radius": 0, "page": 1}),
+        (
+            {"place": "None", "price": "abc", "area": "800", "page": "2"},
+            {"place": "", "price": 0, "area": 800, "radius": 0, "page": 2},
+        ),
+    ],
+)
+def test_normalize_params(params, expected):
+    normalized = normalize_params(params)
+    assert {key: normalized[key] for key in expected} == expected
@@ -27,6 +27,8 @@ urlpatterns = [
         views.FavouriteListView.as_view(),
         name="favourite_list",
     ),
+    path("statistics", views.StatisticsView.as_view(), name="statistics"),
+    path("statistics.json", views.statistics_json, name="statistics_json"),
     path(
         "save_advert/<int:pk>",
         views.save_advert,
@@ -42,6 +44,7 @@ urlpatterns = [
         views.save_all_adverts,
         name="save_all_adverts",
     ),
+    path("save_search", views.save_search, name="save_search"),
     path(
         "delete_all_adverts>",
         views.delete_all_adverts,
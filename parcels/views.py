@@ -1,9 +1,8 @@
-import csv
 import json
 import logging
-from io import StringIO
 from typing import *
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
@@ -13,21 +12,36 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.core.handlers.wsgi import WSGIRequest
 from django.db.models import QuerySet
 from django.http import (
+    Http404,
     HttpResponseRedirect,
     StreamingHttpResponse,
     JsonResponse,
 )
 from django.shortcuts import render, reverse
 from django.template.loader import render_to_string
+from django.utils.decorators import method_decorator
 from django.utils.encoding import force_bytes, force_str
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from django.utils.http import (
+    url_has_allowed_host_and_scheme,
+    urlsafe_base64_encode,
+    urlsafe_base64_decode,
+)
 from django.views.generic import View, ListView, DetailView
 from django.views.generic.edit import FormMixin
 
 from . import tasks
+from .caching import (
+    cache_for_anonymous,
+    conditional_get,
+    get_facets,
+    get_generation,
+)
 from .forms import AdvertForm, SignUpForm, LoginForm, SearchForm
-from .helpers import prepare_csv, Echo, get_adverts
-from .models import Advert, Favourite
+from .exporters import EXPORTERS, get_exporter
+from .helpers import get_adverts
+from .models import Advert, Favourite, PlaceStatistics, SavedSearch
+from .pagination import KeysetPage, KeysetPaginationMixin
+from .snapshot import snapshot
 from .tasks import send_email
 from .tokens import account_activation_token
 
@@ -129,6 +143,15 @@ def user_logout(request: WSGIRequest) -> HttpResponseRedirect:
     return HttpResponseRedirect(reverse("parcels:index"))
 
 
+def get_card_cache_context() -> Dict:
+    """ Returns variables of advert cards cached in advert_list.html. """
+
+    return {
+        "data_generation": get_generation(),
+        "card_cache_timeout": settings.RESPONSE_CACHE_TIMEOUT,
+    }
+
+
 class Index(View):
     template_name = "parcels/advert_form.html"
     form_class = AdvertForm
@@ -141,7 +164,7 @@ class Index(View):
         form = self.form_class(request.POST)
         if form.is_valid():
             return HttpResponseRedirect(
-                "{}?place={place}&price={price}&area={area}".format(
+                "{}?place={place}&price={price}&area={area}&radius={radius}".format(
                     reverse("parcels:advert_list"),
                     **form.cleaned_data,
                 )
@@ -150,13 +173,16 @@ class Index(View):
             for errors in json.loads(form.errors.as_json()).values():
                 for error in errors:
                     messages.error(request, error["message"])
-        form = self.form_class()
+        form = self.form_class(data_list=Advert.get_places())
         return render(self.request, "parcels/advert_form.html", {"form": form})
 
 
-class AdvertListView(FormMixin, ListView):
+@method_decorator(conditional_get, name="get")
+@method_decorator(cache_for_anonymous, name="get")
+class AdvertListView(KeysetPaginationMixin, FormMixin, ListView):
     template_name = "parcels/advert_list.html"
     paginate_by = 15
+    keyset_pagination = settings.KEYSET_PAGINATION
     model = Advert
     form_class = SearchForm
 
@@ -165,36 +191,30 @@ class AdvertListView(FormMixin, ListView):
         price = self.request.GET.get("price", 0)
         area = self.request.GET.get("area", 0)
         search_text = self.request.GET.get("search_text", None)
-        queryset = Advert.filter_adverts(place, price, area, search_text)
+        radius = self.request.GET.get("radius", 0)
+        if settings.ADVERTS_SNAPSHOT and not self.keyset_pagination:
+            result = snapshot.filter(place, price, area, search_text, radius)
+            if result is not None:
+                return result
+        queryset = Advert.filter_adverts(place, price, area, search_text, radius)
         return queryset
 
     def get_context_data(self, **kwargs) -> Dict:
         context = super().get_context_data(**kwargs)
         context.update(self.request.GET.dict())
-        self.request.session["view_name"] = "adverts"
+        context.update(get_card_cache_context())
+        context["facets"] = get_facets(self.object_list, self.request.GET)
+        context["view_name"] = "adverts"
         return context
 
-    def post(self, request, *args, **kwargs):
-        queryset = kwargs.pop("object_list", None)
-        if queryset is None:
-            self.object_list = self.get_queryset()
-        context = super().get_context_data(**kwargs)
-        context.update(self.request.GET.dict())
-        form = self.form_class(request.POST)
-        context["search_text"] = None
-        if form.is_valid():
-            context["search_text"] = form.cleaned_data.get("search_text", None)
-        self.request.session["view_name"] = "adverts"
-        return HttpResponseRedirect(
-            "{}?place={place}&price={price}&area={area}&search_text={search_text}".format(
-                reverse("parcels:advert_list"), **context
-            )
-        )
-
 
-class FavouriteListView(LoginRequiredMixin, FormMixin, ListView):
+@method_decorator(conditional_get, name="get")
+class FavouriteListView(
+    LoginRequiredMixin, KeysetPaginationMixin, FormMixin, ListView
+):
     template_name = "parcels/advert_list.html"
     paginate_by = 15
+    keyset_pagination = settings.KEYSET_PAGINATION
     model = Advert
     form_class = SearchForm
 
@@ -209,6 +229,11 @@ class FavouriteListView(LoginRequiredMixin, FormMixin, ListView):
     def get_next_url(context: Dict) -> str:
         page_obj = context.get("page_obj", 1)
         search_text = context.get("search_text", None)
+        if isinstance(page_obj, KeysetPage):
+            cursor = page_obj.cursor or ""
+            if len(page_obj.object_list) < 2 and page_obj.has_previous():
+                cursor = page_obj.previous_cursor
+            return f"{reverse('parcels:favourite_list')}?search_text={search_text}&cursor={cursor}"
         if len(page_obj.object_list) < 2 and page_obj.has_previous():
             next_page = page_obj.previous_page_number()
         else:
@@ -218,28 +243,14 @@ class FavouriteListView(LoginRequiredMixin, FormMixin, ListView):
     def get_context_data(self, **kwargs) -> Dict:
         context = super().get_context_data(**kwargs)
         context.update(self.request.GET.dict())
-        self.request.session["next_url"] = self.get_next_url(context)
-        self.request.session["view_name"] = "favourites"
+        context.update(get_card_cache_context())
+        context["next_url"] = self.get_next_url(context)
+        context["view_name"] = "favourites"
         return context
 
-    def post(self, request, *args, **kwargs):
-        queryset = kwargs.pop("object_list", None)
-        if queryset is None:
-            self.object_list = self.get_queryset()
-        context = super().get_context_data(**kwargs)
-        context.update(self.request.GET.dict())
-        form = self.form_class(request.POST)
-        context["search_text"] = None
-        if form.is_valid():
-            context["search_text"] = form.cleaned_data.get("search_text", None)
-        self.request.session["view_name"] = "favourites"
-        return HttpResponseRedirect(
-            "{}?search_text={search_text}".format(
-                reverse("parcels:favourite_list"), **context
-            )
-        )
-
 
+@method_decorator(conditional_get, name="get")
+@method_decorator(cache_for_anonymous, name="get")
 class AdvertDetailView(DetailView):
     template_name = "parcels/advert_detail.html"
     model = Advert
@@ -253,6 +264,16 @@ class AdvertDetailView(DetailView):
         return context
 
 
+class StatisticsView(ListView):
+    template_name = "parcels/statistics.html"
+    model = PlaceStatistics
+
+
+def statistics_json(request: WSGIRequest) -> JsonResponse:
+    statistics = list(PlaceStatistics.objects.values())
+    return JsonResponse({"statistics": statistics})
+
+
 @login_required
 def save_advert(request: WSGIRequest, pk: int) -> HttpResponseRedirect:
     """ Add advert to favourites adverts. """
@@ -268,9 +289,8 @@ def delete_advert(request: WSGIRequest, pk: int) -> HttpResponseRedirect:
 
     advert = Advert.get_advert(_id=pk)
     Favourite.remove_from_favourite(user_id=request.user.id, adverts=advert)
-    next_url = request.session.get("next_url", None)
-    view_name = request.session.get("view_name", None)
-    if next_url is None or view_name != "favourites":
+    next_url = request.GET.get("next", None)
+    if not url_has_allowed_host_and_scheme(next_url, {request.get_host()}):
         next_url = request.META["HTTP_REFERER"]
     return HttpResponseRedirect(next_url)
 
@@ -284,16 +304,33 @@ def save_all_adverts(request: WSGIRequest) -> HttpResponseRedirect:
         price=request.GET.get("price", 0),
         area=request.GET.get("area", 0),
         search_text=request.GET.get("search_text", None),
+        radius=request.GET.get("radius", 0),
     )
     Favourite.add_to_favourite(user_id=request.user.id, adverts=adverts)
     return HttpResponseRedirect(request.META["HTTP_REFERER"])
 
 
+@login_required
+def save_search(request: WSGIRequest) -> HttpResponseRedirect:
+    """ Saves filters from view, so the user is emailed about new matching adverts. """
+
+    if Advert.convert_input(request.GET.get("radius", 0), int):
+        messages.error(
+            request, "Nie można zapisać wyszukiwania w promieniu od miejscowości."
+        )
+    else:
+        SavedSearch.save_search(user_id=request.user.id, params=request.GET.dict())
+        messages.success(
+            request, "Zapisano wyszukiwanie. Powiadomimy Cię o nowych działkach."
+        )
+    return HttpResponseRedirect(request.META["HTTP_REFERER"])
+
+
 @login_required
 def delete_all_adverts(request: WSGIRequest) -> HttpResponseRedirect:
     """ Delete all adverts from view from favourite adverts. """
 
-    if request.session.get("view_name", None) == "favourites":
+    if request.GET.get("view", None) == "favourites":
         next_url = reverse("parcels:favourite_list")
     else:
         next_url = request.META["HTTP_REFERER"]
@@ -302,30 +339,30 @@ def delete_all_adverts(request: WSGIRequest) -> HttpResponseRedirect:
     return HttpResponseRedirect(next_url)
 
 
+def get_export_format(request: WSGIRequest) -> str:
+    export_format = request.GET.get("format", "csv")
+    if export_format not in EXPORTERS:
+        raise Http404("Unknown export format.")
+    return export_format
+
+
+@conditional_get
 def streaming_csv(request: WSGIRequest) -> StreamingHttpResponse:
+    exporter = get_exporter(get_export_format(request))
     adverts = get_adverts(request)
-    rows = prepare_csv(adverts)
-    pseudo_buffer = Echo()
-    writer = csv.writer(pseudo_buffer)
     response = StreamingHttpResponse(
-        (writer.writerow(row) for row in rows), content_type="text/csv"
+        exporter.stream(adverts), content_type=exporter.content_type
     )
-    response["Content-Disposition"] = 'attachment; filename="your_adverts.csv"'
+    response["Content-Disposition"] = f'attachment; filename="{exporter.filename}"'
     return response
 
 
 def sending_csv(request: WSGIRequest) -> HttpResponseRedirect:
-    adverts = get_adverts(request)
-    rows = prepare_csv(adverts)
-    csv_file = StringIO()
-    writer = csv.writer(csv_file)
-    [writer.writerow(row) for row in rows]
-    user = User.objects.get(pk=request.user.id)
-    recipient = user.email
-    send_email.delay(
-        subject="ParcelsScraper - wybrane działki",
-        body="W załączeniu przesyłamy wybrane przez Ciebie działki.",
-        to=[recipient],
-        attachments=[("your_adverts.csv", csv_file.getvalue(), "text/csv")],
+    tasks.send_adverts_csv.delay(
+        user_id=request.user.id,
+        view_name=request.GET.get("view", None),
+        params=request.GET.dict(),
+        compress=settings.EMAIL_CSV_COMPRESS,
+        export_format=get_export_format(request),
     )
     return HttpResponseRedirect(request.META["HTTP_REFERER"])
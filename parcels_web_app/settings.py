@@ -103,6 +103,18 @@ CACHES = {
     }
 }
 
+# Paginate adverts lists with a cursor instead of page numbers
+KEYSET_PAGINATION = bool(int(os.environ.get("KEYSET_PAGINATION", 0)))
+
+# Filter adverts lists in memory instead of querying the database
+ADVERTS_SNAPSHOT = bool(int(os.environ.get("ADVERTS_SNAPSHOT", 0)))
+
+# Full text search configuration used for adverts descriptions
+SEARCH_CONFIG = os.environ.get("SEARCH_CONFIG", "polish_unaccent")
+
+# Pages for anonymous users are also invalidated when new adverts are loaded
+RESPONSE_CACHE_TIMEOUT = int(timedelta(days=7).total_seconds())
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -163,6 +175,15 @@ EMAIL_HOST_USER = os.environ.get("EMAIL_USERNAME")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_PASSWORD")
 EMAIL_PORT = os.environ.get("EMAIL_PORT")
 DEFAULT_FROM_EMAIL = os.environ.get("EMAIL_USERNAME")
+EMAIL_TIMEOUT = 30
+# Bulk emails are sent in batches of EMAIL_BATCH_SIZE over one SMTP
+# connection. Transient failures are retried after EMAIL_RETRY_BACKOFF
+# seconds doubled on every attempt
+EMAIL_BATCH_SIZE = 50
+EMAIL_MAX_RETRIES = 5
+EMAIL_RETRY_BACKOFF = 60
+# Compress csv files with adverts attached to emails
+EMAIL_CSV_COMPRESS = bool(int(os.environ.get("EMAIL_CSV_COMPRESS", 0)))
 
 CRISPY_TEMPLATE_PACK = "bootstrap4"
 
@@ -178,6 +199,8 @@ CELERY_BEAT_SCHEDULE = {
 
 # Scrapy Configuration Options
 SCRAPED_DATA_CATALOG = os.path.join(BASE_DIR, "scraped_data")
+# Amount of adverts saved to the database at once by AdvertsCrawlerPipeline
+ADVERTS_BATCH_SIZE = 100
 
 # Heroku Configuration Options
 django_heroku.settings(locals())